@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException
+from app.db.mongodb import get_database
+from app.services.room_state import AnswerKey, Participant
+from app.services.websocket_manager import manager
+
+router = APIRouter()
+
+
+@router.get("/{room_code}", response_description="Item analysis of a finished exam")
+async def room_analytics(room_code: str):
+    """
+    Percent correct, response rate, option distribution and discrimination index per
+    question, plus the score histogram, for the room's finished session. Live rooms are
+    read from memory; rooms already reaped from their archived game_sessions and
+    session_participants documents.
+    """
+    # NumPy is ~100 ms of import; only the first analytics request pays it, not startup
+    from app.services.analytics import exam_analytics
+
+    room = manager.room_states.get(room_code)
+    if room is not None:
+        if room.status != "leaderboard":
+            raise HTTPException(status_code=409, detail="Exam is not finished yet")
+        report = exam_analytics.cached(room.session_id)
+        if report is None:
+            report = await exam_analytics.compute(
+                room.session_id, room_code, room.quiz.answer_key, list(room.participants.values())
+            )
+        return report
+
+    # The latest finished session that used this code
+    db = await get_database()
+    session = await db["game_sessions"].find_one(
+        {"room_code": room_code, "state.status": "leaderboard"}, sort=[("created_at", -1)]
+    )
+    if not session:
+        raise HTTPException(status_code=404, detail="No finished exam for this room")
+    session_id = str(session["_id"])
+    report = exam_analytics.cached(session_id)
+    if report is not None:
+        return report
+
+    # Graded against the answer key the session was played with, never the quiz as it
+    # is now: it may have been edited or deleted since
+    if "answer_key" not in session:
+        raise HTTPException(status_code=409, detail="Session has no answer key to grade against")
+    answer_key = AnswerKey.from_document(session["answer_key"])
+    participants = [
+        Participant.from_dict({"id": doc["player_id"], **doc}, len(answer_key))
+        async for doc in db["session_participants"].find({"session_id": session_id})
+    ]
+    return await exam_analytics.compute(session_id, room_code, answer_key, participants)
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, Body, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Body, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
-from app.models.quiz import QuizDB, QuizCreate
+from app.models.quiz import QuizDB, QuizCreate, QuizPage
 from app.db.mongodb import get_database
+from app.services.websocket_manager import manager
+from app.services.quiz_cache import fetch_quiz, quiz_cache
+from app.services.encoding import encode
+from app.core.config import settings
 from bson import ObjectId
 from datetime import datetime
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+import base64
+import json
+import time
 
 router = APIRouter()
 
@@ -22,26 +31,154 @@ async def create_quiz(quiz: QuizCreate = Body(...)):
     quiz_op["updated_at"] = datetime.utcnow()
     
     new_quiz = await db["quizzes"].insert_one(quiz_op)
+    quiz_cache.invalidate(str(new_quiz.inserted_id))
     created_quiz = await db["quizzes"].find_one({"_id": new_quiz.inserted_id})
     return created_quiz
 
-@router.get("/", response_description="List all quizzes", response_model=List[QuizDB])
-async def list_quizzes():
+# Summary projection for list pages: no questions, just how many there are
+SUMMARY_PROJECTION = {
+    "title": 1,
+    "description": 1,
+    "topic": 1,
+    "difficulty_level": 1,
+    "organization_id": 1,
+    "created_by": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "question_count": {"$size": {"$ifNull": ["$questions", []]}},
+}
+
+@router.post("/bulk", response_description="Import many quizzes")
+async def bulk_import_quizzes(request: Request):
+    """
+    Accepts a JSON array of quizzes, or NDJSON (one quiz per line) with
+    Content-Type application/x-ndjson, which is read as a stream. Items are
+    validated and inserted in batches of QUIZ_IMPORT_BATCH_SIZE; one bad item
+    never blocks the rest. Returns one result per input item, by position.
+    """
+    db = await get_database()
+    started = time.perf_counter()
+    results = []
+    batch = []
+
+    async def flush():
+        # Validate the batch, then insert every valid item in one unordered round trip
+        docs, positions = [], []
+        now = datetime.utcnow()
+        for index, item in batch:
+            try:
+                quiz_op = jsonable_encoder(QuizCreate.model_validate(item))
+            except ValidationError as e:
+                results.append({"index": index, "error": e.errors(include_url=False, include_context=False)})
+                continue
+            quiz_op["created_at"] = now
+            quiz_op["updated_at"] = now
+            docs.append(quiz_op)
+            positions.append(index)
+        batch.clear()
+        if not docs:
+            return
+
+        failed = {}
+        try:
+            await db["quizzes"].insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            failed = {err["index"]: err.get("errmsg", "write failed") for err in e.details.get("writeErrors", [])}
+        # insert_many assigns _id on the documents themselves, so no re-read is needed
+        for i, (index, doc) in enumerate(zip(positions, docs)):
+            if i in failed:
+                results.append({"index": index, "error": failed[i]})
+            else:
+                results.append({"index": index, "id": str(doc["_id"])})
+
+    count = 0
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        async for line in _ndjson_lines(request):
+            try:
+                batch.append((count, json.loads(line)))
+            except json.JSONDecodeError as e:
+                results.append({"index": count, "error": f"Invalid JSON: {e}"})
+            count += 1
+            if len(batch) >= settings.QUIZ_IMPORT_BATCH_SIZE:
+                await flush()
+    else:
+        try:
+            items = await request.json()
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        for item in items:
+            batch.append((count, item))
+            count += 1
+            if len(batch) >= settings.QUIZ_IMPORT_BATCH_SIZE:
+                await flush()
+    await flush()
+
+    elapsed = time.perf_counter() - started
+    inserted = sum(1 for r in results if "id" in r)
+    results.sort(key=lambda r: r["index"])
+    return {
+        "received": count,
+        "inserted": inserted,
+        "failed": count - inserted,
+        "elapsed_seconds": round(elapsed, 3),
+        "quizzes_per_second": round(inserted / elapsed, 1) if elapsed > 0 else None,
+        "results": results,
+    }
+
+async def _ndjson_lines(request: Request):
+    # Split the streamed body into lines without buffering the whole upload
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+@router.get("/", response_description="List quizzes, newest first", response_model=QuizPage)
+async def list_quizzes(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    organization_id: Optional[str] = None,
+    topic: Optional[str] = None,
+):
+    db = await get_database()
+    match = _list_filter(organization_id, topic, cursor)
+
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"created_at": -1, "_id": -1}},
+        {"$limit": limit + 1}, # One extra tells us whether another page exists
+        {"$project": SUMMARY_PROJECTION},
+    ]
+    items = await db["quizzes"].aggregate(pipeline).to_list(limit + 1)
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = _encode_cursor(items[-1])
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export", response_description="Stream full quizzes as NDJSON")
+async def export_quizzes(organization_id: Optional[str] = None, topic: Optional[str] = None):
     db = await get_database()
-    quizzes = await db["quizzes"].find().to_list(1000)
-    return quizzes
+    match = _list_filter(organization_id, topic)
+
+    async def lines():
+        # Documents are encoded one at a time as the cursor yields batches
+        async for quiz in db["quizzes"].find(match).sort([("created_at", -1), ("_id", -1)]).batch_size(200):
+            yield encode(quiz) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @router.get("/{id}", response_description="Get a single quiz", response_model=QuizDB)
 async def show_quiz(id: str):
-    db = await get_database()
-    if (quiz := await db["quizzes"].find_one({"_id": id})) is not None:
+    if (quiz := await fetch_quiz(id)) is not None:
         return quiz
-    # Try ObjectId if string lookup fail
-    try:
-        if (quiz := await db["quizzes"].find_one({"_id": ObjectId(id)})) is not None:
-            return quiz
-    except:
-        pass
         
     raise HTTPException(status_code=404, detail=f"Quiz {id} not found")
 
@@ -53,6 +190,7 @@ async def delete_quiz(id: str):
     try:
         delete_result = await db["quizzes"].delete_one({"_id": ObjectId(id)})
         if delete_result.deleted_count == 1:
+            _invalidate_quiz(id)
             return JSONResponse(status_code=status.HTTP_204_NO_CONTENT)
     except Exception:
         pass # invalid objectid or not found
@@ -60,6 +198,46 @@ async def delete_quiz(id: str):
     # Fallback to string ID
     delete_result = await db["quizzes"].delete_one({"_id": id})
     if delete_result.deleted_count == 1:
+        _invalidate_quiz(id)
         return JSONResponse(status_code=status.HTTP_204_NO_CONTENT)
 
     raise HTTPException(status_code=404, detail=f"Quiz {id} not found")
+
+def _invalidate_quiz(id: str):
+    # Drop the cached document and any cached question payloads for it
+    quiz_cache.invalidate(id)
+    manager.invalidate_quiz(id)
+
+def _list_filter(organization_id: Optional[str], topic: Optional[str], cursor: Optional[str] = None) -> dict:
+    match = {}
+    if organization_id:
+        match["organization_id"] = organization_id
+    if topic:
+        match["topic"] = topic
+    if cursor:
+        # Keyset pagination: strictly after the last (created_at, _id) already returned
+        created_at, last_id = _decode_cursor(cursor)
+        match["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}},
+        ]
+    return match
+
+def _encode_cursor(quiz: dict) -> str:
+    _id = quiz["_id"]
+    raw = json.dumps([
+        quiz.get("created_at").isoformat() if quiz.get("created_at") else None,
+        str(_id),
+        isinstance(_id, ObjectId),
+    ])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, _id, is_object_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (
+            datetime.fromisoformat(created_at) if created_at else None,
+            ObjectId(_id) if is_object_id else _id,
+        )
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -20,9 +20,94 @@ class Settings(BaseSettings):
     # Database
     MONGODB_URL: str = "mongodb://localhost:27017"
     DATABASE_NAME: str = "quizpulse_db"
+    # Connections opened at startup and kept open, so the first requests after a cold
+    # start don't each pay a TCP/TLS handshake (0 = open on demand)
+    MONGODB_MIN_POOL_SIZE: int = 4
+    # Quiz documents are cached in front of Mongo (LRU, bounded, with expiry)
+    QUIZ_CACHE_SIZE: int = 512
+    QUIZ_CACHE_TTL_SECONDS: float = 60.0
+    # Quizzes validated and written per insert_many during bulk import
+    QUIZ_IMPORT_BATCH_SIZE: int = 500
+    # Write-behind of sessions/answers: flush at this many answers or this often
+    SESSION_WRITE_QUEUE_SIZE: int = 50000
+    SESSION_WRITE_BATCH_SIZE: int = 1000
+    SESSION_WRITE_INTERVAL_SECONDS: float = 1.0
+    SESSION_WRITE_MAX_BACKOFF_SECONDS: float = 30.0
+    # Crash recovery: per-room event log, group-committed every interval, with a
+    # snapshot (and pruning of the events it covers) every N events per session. A
+    # snapshot costs O(players), so N grows with the room (EVENTS_PER_PARTICIPANT per
+    # player, at least EVERY_EVENTS), and a session is snapshotted at most once per
+    # MIN_INTERVAL, however fast answers arrive
+    ROOM_EVENT_LOG_ENABLED: bool = True
+    ROOM_EVENT_FLUSH_INTERVAL_MS: int = 50
+    ROOM_SNAPSHOT_EVERY_EVENTS: int = 200
+    ROOM_SNAPSHOT_EVENTS_PER_PARTICIPANT: int = 1
+    ROOM_SNAPSHOT_MIN_INTERVAL_SECONDS: float = 5.0
+    # Longest startup waits to replay the log before serving without the old rooms
+    ROOM_RECOVERY_TIMEOUT_SECONDS: float = 10.0
+    # Item analysis of finished exams: reports cached per session, score histogram bins
+    ANALYTICS_CACHE_SIZE: int = 256
+    ANALYTICS_HISTOGRAM_BINS: int = 10
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
+    REDIS_MIN_POOL_SIZE: int = 4
+    # Bounds how long an unreachable Redis host can stall a connection attempt
+    REDIS_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    # "memory" keeps rooms in one process; "redis" shares them across workers
+    ROOM_STATE_BACKEND: str = "memory"
+    # Redis room keys expire this long after the room's last write (refreshed on every
+    # update), so rooms no worker holds any more don't pile up in Redis
+    ROOM_STORE_TTL_SECONDS: float = 4 * 3600.0
+    # Sharding (see run_shards.py): SHARD_COUNT worker processes, each owning the room
+    # codes that consistent-hash to its SHARD_INDEX. SHARD_URLS are the shards' public
+    # WebSocket base URLs by index; sockets that reach the wrong shard are sent there.
+    SHARD_COUNT: int = 1
+    SHARD_INDEX: int = 0
+    SHARD_URLS: List[str] = [] # JSON list in the environment
+    SHARD_VNODES: int = 128
+
+    # Realtime
+    # Participant progress updates are coalesced and flushed at most once per tick
+    ROSTER_FLUSH_INTERVAL_MS: int = 250
+    # Roster deltas remembered per room, so a resuming client gets only what it missed
+    ROSTER_LOG_SIZE: int = 64
+    # Signs resume tokens. Leave empty for a random per-process key (resume then only
+    # works on the same worker); set it to let any worker, or a restart, honour them.
+    RESUME_TOKEN_SECRET: str = ""
+    # Per-socket outbound buffering; clients that fall behind are disconnected
+    WS_SEND_QUEUE_SIZE: int = 64
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0
+    # Inbound limits: max frame size, then token buckets per socket and per room
+    # (start_game/force_submit only count against the socket). Excess frames are dropped.
+    WS_MAX_FRAME_BYTES: int = 4096
+    WS_CLIENT_RATE_PER_SECOND: float = 10.0
+    WS_CLIENT_BURST: int = 20
+    WS_ROOM_RATE_PER_SECOND: float = 1000.0
+    WS_ROOM_BURST: int = 2000
+    # New WebSocket connections admitted per second (after a burst), so a reconnect
+    # storm is spread out instead of stalling the event loop
+    WS_ADMISSION_RATE_PER_SECOND: float = 200.0
+    WS_ADMISSION_BURST: int = 50
+    # Live mode pacing: lead-in before question 1, and how long each answer is shown
+    LIVE_COUNTDOWN_SECONDS: float = 3.0
+    LIVE_REVEAL_SECONDS: float = 5.0
+    # Leaderboard frames carry only the top K; every player also gets their own rank
+    LEADERBOARD_TOP_K: int = 10
+    # Distinct quiz revisions whose sanitized question payload is kept pre-encoded
+    QUESTION_CACHE_SIZE: int = 256
+    # Idle room eviction: TTL per status (rooms with connected players are never evicted),
+    # hard caps on rooms held per worker, and whether to archive the final state first
+    ROOM_REAPER_INTERVAL_SECONDS: float = 30.0
+    ROOM_TTL_LOBBY_SECONDS: float = 3600.0
+    ROOM_TTL_ACTIVE_SECONDS: float = 4 * 3600.0
+    ROOM_TTL_LEADERBOARD_SECONDS: float = 900.0
+    ROOM_MAX_COUNT: int = 20000
+    ROOM_MAX_BYTES: int = 1024 * 1024 * 1024
+    ROOM_ARCHIVE_ON_EVICT: bool = True
+    # Codes of reaped rooms wait this long before reuse, so stragglers can't wander into
+    # a new room. With Redis rooms, a code is claimed for as long as its room's keys live.
+    ROOM_CODE_REUSE_DELAY_SECONDS: float = 600.0
 
     # AI
     GOOGLE_API_KEY: str = ""
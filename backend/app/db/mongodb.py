@@ -9,11 +9,52 @@ db = Database()
 async def get_database():
     return db.client[settings.DATABASE_NAME]
 
-import certifi
+import asyncio
+from app.services.metrics import mongo_command_metrics
 
 async def connect_to_mongo():
-    db.client = AsyncIOMotorClient(settings.MONGODB_URL, tlsCAFile=certifi.where())
+    # certifi costs ~40 ms of import and is only needed here
+    import certifi
+
+    db.client = AsyncIOMotorClient(
+        settings.MONGODB_URL, tlsCAFile=certifi.where(), event_listeners=[mongo_command_metrics],
+        minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+    )
     print("Connected to MongoDB")
+    # No I/O here: the driver connects on first use. Indexes and warm-up are
+    # prepare_mongo(), which startup runs in the background.
+
+async def prepare_mongo():
+    # Never awaited by startup, so an unreachable server can't hold back readiness
+    try:
+        await asyncio.gather(warm_mongo_pool(), ensure_indexes())
+    except Exception as e:
+        print(f"MongoDB index build / pool warm-up failed: {e}")
+
+async def warm_mongo_pool():
+    # The driver connects lazily and only tops up minPoolSize in the background;
+    # concurrent pings check out (and so open) that many connections right away
+    if settings.MONGODB_MIN_POOL_SIZE <= 0:
+        return
+    await asyncio.gather(*(db.client.admin.command("ping") for _ in range(settings.MONGODB_MIN_POOL_SIZE)))
+
+async def ensure_indexes():
+    # All issued at once: one round trip's wait at startup instead of one per index
+    database = db.client[settings.DATABASE_NAME]
+    quizzes = database["quizzes"]
+    await asyncio.gather(
+        # Support the keyset-paginated quiz listing (newest first, optionally filtered)
+        quizzes.create_index([("created_at", -1), ("_id", -1)]),
+        quizzes.create_index([("organization_id", 1), ("created_at", -1), ("_id", -1)]),
+        quizzes.create_index([("topic", 1), ("created_at", -1), ("_id", -1)]),
+        # Written by the session write-behind pipeline
+        database["session_answers"].create_index([("session_id", 1), ("player_id", 1)]),
+        database["game_sessions"].create_index([("room_code", 1), ("created_at", -1)]),
+        database["session_participants"].create_index([("session_id", 1)]),
+        # Room event log replayed on startup
+        database["room_events"].create_index([("session_id", 1), ("seq", 1)]),
+        database["room_events"].create_index([("kind", 1), ("at", 1)]),
+    )
 
 async def close_mongo_connection():
     db.client.close()
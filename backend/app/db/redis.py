@@ -1,3 +1,4 @@
+import asyncio
 import redis.asyncio as redis
 from ..core.config import settings
 
@@ -7,9 +8,23 @@ class RedisClient:
 redis_client = RedisClient()
 
 async def connect_to_redis():
-    redis_client.client = redis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
+    redis_client.client = redis.from_url(
+        settings.REDIS_URL, encoding="utf-8", decode_responses=True,
+        socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT_SECONDS,
+    )
     print("Connected to Redis")
 
+async def warm_redis_pool():
+    # from_url connects lazily; concurrent pings each take (and so open) a pooled connection.
+    # Only worth it when rooms live in Redis; startup runs it in the background, and a
+    # failure only means cold connections later.
+    if settings.ROOM_STATE_BACKEND == "memory" or settings.REDIS_MIN_POOL_SIZE <= 0:
+        return
+    try:
+        await asyncio.gather(*(redis_client.client.ping() for _ in range(settings.REDIS_MIN_POOL_SIZE)))
+    except Exception as e:
+        print(f"Redis pool warm-up failed: {e}")
+
 async def close_redis_connection():
     await redis_client.client.close()
     print("Closed Redis connection")
@@ -40,3 +40,21 @@ class QuizDB(QuizBase):
         allow_population_by_field_name = True
         arbitrary_types_allowed = True
         json_encoders = {ObjectId: str}
+
+class QuizSummary(QuizBase):
+    # List-page projection: everything but the questions themselves
+    id: Optional[PyObjectId] = Field(None, alias="_id")
+    organization_id: str
+    created_by: str
+    question_count: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        allow_population_by_field_name = True
+        arbitrary_types_allowed = True
+        json_encoders = {ObjectId: str}
+
+class QuizPage(BaseModel):
+    items: List[QuizSummary] = []
+    next_cursor: Optional[str] = None # Pass back as ?cursor= for the next page
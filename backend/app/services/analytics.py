@@ -0,0 +1,117 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import asyncio
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.room_state import UNANSWERED, AnswerKey, Participant
+
+# Share of participants in the upper and lower groups of the discrimination index
+DISCRIMINATION_GROUP = 0.27
+
+
+def answer_matrix(participants: List[Participant], question_count: int) -> np.ndarray:
+    """
+    Participants x questions int8 matrix of chosen options (UNANSWERED = -1).
+
+    Each participant's answers are already a packed array('b'), so this is one join of
+    raw buffers, not a loop over questions.
+    """
+    if not participants:
+        return np.empty((0, question_count), dtype=np.int8)
+    raw = b"".join(p.answers.tobytes() for p in participants)
+    return np.frombuffer(raw, dtype=np.int8).reshape(len(participants), question_count)
+
+
+def item_analysis(answers: np.ndarray, scores: np.ndarray, answer_key: AnswerKey) -> dict:
+    """
+    Per-question and per-option statistics for a finished exam, all vectorized:
+    percent correct, response rate, option distribution, upper/lower-27% discrimination
+    index, plus a histogram and summary of final scores.
+    """
+    participant_count, question_count = answers.shape
+    key = np.frombuffer(answer_key.correct, dtype=np.int8)
+    option_counts = np.frombuffer(answer_key.option_counts, dtype=np.int8)
+    width = max(int(option_counts.max(initial=0)), 1)
+
+    answered = answers != UNANSWERED
+    # A question with no correct option marked is never counted as answered correctly
+    correct = (answers == key) & (key != UNANSWERED)
+
+    # Option distribution: one bincount over (question, option) cells. An option the
+    # question doesn't have counts as a response but lands in no cell.
+    in_range = answered & (answers < option_counts)
+    cells = (np.arange(question_count) * width + answers)[in_range]
+    distribution = np.bincount(cells, minlength=question_count * width).reshape(question_count, width)
+
+    if participant_count:
+        percent_correct = correct.mean(axis=0) * 100
+        response_rate = answered.mean(axis=0) * 100
+        # Discrimination: p(correct) among the top 27% by score minus the bottom 27%
+        group = max(1, int(round(participant_count * DISCRIMINATION_GROUP)))
+        order = np.argsort(scores, kind="stable")
+        discrimination = correct[order[-group:]].mean(axis=0) - correct[order[:group]].mean(axis=0)
+    else:
+        percent_correct = response_rate = discrimination = np.zeros(question_count)
+
+    counts, edges = np.histogram(scores, bins=settings.ANALYTICS_HISTOGRAM_BINS)
+    return {
+        "participants": participant_count,
+        "questions": question_count,
+        "scores": {
+            "mean": round(float(scores.mean()), 2) if participant_count else 0,
+            "median": float(np.median(scores)) if participant_count else 0,
+            "std": round(float(scores.std()), 2) if participant_count else 0,
+            "min": int(scores.min()) if participant_count else 0,
+            "max": int(scores.max()) if participant_count else 0,
+            "histogram": {"edges": np.round(edges, 2).tolist(), "counts": counts.tolist()},
+        },
+        "items": [
+            {
+                "index": q,
+                "correct_option": int(key[q]),
+                "percent_correct": round(float(percent_correct[q]), 1),
+                "response_rate": round(float(response_rate[q]), 1),
+                "discrimination": round(float(discrimination[q]), 3),
+                "options": distribution[q, :option_counts[q]].tolist(),
+            }
+            for q in range(question_count)
+        ],
+    }
+
+
+class ExamAnalytics:
+    """
+    Item analysis of finished sessions, computed once and cached per session id
+    (LRU, ANALYTICS_CACHE_SIZE entries). A finished session no longer changes, so
+    entries never go stale. The NumPy work runs in a thread, off the event loop.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "computed": 0}
+
+    def cached(self, session_id: str) -> Optional[dict]:
+        report = self._entries.get(session_id)
+        if report is not None:
+            self._entries.move_to_end(session_id)
+            self.stats["hits"] += 1
+        return report
+
+    async def compute(
+        self, session_id: str, room_code: str, answer_key: AnswerKey, participants: List[Participant]
+    ) -> dict:
+        answers = answer_matrix(participants, len(answer_key))
+        scores = np.fromiter((p.score for p in participants), dtype=np.int64, count=len(participants))
+        report = await asyncio.to_thread(item_analysis, answers, scores, answer_key)
+        report = {"session_id": session_id, "room_code": room_code, **report}
+        self._entries[session_id] = report
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        self.stats["computed"] += 1
+        return report
+
+
+exam_analytics = ExamAnalytics(settings.ANALYTICS_CACHE_SIZE)
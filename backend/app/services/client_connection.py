@@ -0,0 +1,107 @@
+from typing import Callable, Dict, Optional, Union
+from fastapi import WebSocket
+import asyncio
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Close code sent to clients that cannot keep up (RFC 6455 "Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+async def _send_with_timeout(websocket: WebSocket, frame: Union[str, bytes], timeout: float):
+    # asyncio.timeout (3.11+) needs no extra task per send and, unlike wait_for on
+    # 3.11, never swallows a cancellation that races with a finishing send
+    send = websocket.send_bytes(frame) if isinstance(frame, bytes) else websocket.send_text(frame)
+    if hasattr(asyncio, "timeout"):
+        async with asyncio.timeout(timeout):
+            await send
+    else:
+        await asyncio.wait_for(send, timeout)
+
+
+class ClientConnection:
+    """
+    One player's socket plus a bounded outbound queue drained by its own writer task.
+
+    Broadcasts only enqueue, so a stalled client never delays delivery to the rest of
+    the room. A client whose queue overflows or whose send exceeds the timeout is
+    evicted: its socket is closed and `on_evict` lets the manager forget it.
+
+    `binary` connections negotiated the MessagePack sub-protocol and are sent bytes
+    frames; everyone else gets JSON text.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        stats: Dict[str, int],
+        on_evict: Optional[Callable[["ClientConnection"], None]] = None,
+        binary: bool = False,
+    ):
+        self.websocket = websocket
+        self.binary = binary
+        self.stats = stats
+        self.on_evict = on_evict
+        self.closed = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_SEND_QUEUE_SIZE)
+        self._writer = asyncio.create_task(self._drain())
+
+    def enqueue(self, frame: Union[str, bytes]) -> bool:
+        # `frame` is already encoded, shared by every recipient of a broadcast
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            self.stats["messages_dropped"] += 1
+            logger.warning("Outbound queue full, evicting slow consumer")
+            self.evict()
+            return False
+
+    def evict(self):
+        if self.closed:
+            return
+        self.stats["consumers_evicted"] += 1
+        self.stats["messages_dropped"] += self._queue.qsize()
+        self._shutdown()
+        asyncio.ensure_future(self._close_socket(SLOW_CONSUMER_CLOSE_CODE))
+        if self.on_evict:
+            self.on_evict(self)
+
+    def close(self):
+        # Normal teardown after the client went away; nothing left to deliver
+        self._shutdown()
+
+    def _shutdown(self):
+        self.closed = True
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    async def _close_socket(self, code: int):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), settings.WS_SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+
+    async def _drain(self):
+        while not self.closed:
+            frame = await self._queue.get()
+            try:
+                await _send_with_timeout(self.websocket, frame, settings.WS_SEND_TIMEOUT_SECONDS)
+                self.stats["messages_sent"] += 1
+            except asyncio.TimeoutError:
+                self.stats["send_timeouts"] += 1
+                logger.warning("Send timed out, evicting slow consumer")
+                self.evict()
+                return
+            except Exception as e:
+                # Socket is gone; the receive loop will report the disconnect
+                self.stats["send_failures"] += 1
+                self.stats["messages_dropped"] += self._queue.qsize()
+                logger.debug(f"Send failed: {e}")
+                self._shutdown()
+                return
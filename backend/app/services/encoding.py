@@ -0,0 +1,65 @@
+from typing import Any, List, Optional, Union
+from bson import ObjectId
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - binary clients are optional
+    msgpack = None
+
+# Sec-WebSocket-Protocol values a client may offer; with neither it gets JSON text
+MSGPACK_SUBPROTOCOL = "quizpulse.msgpack.v1"
+JSON_SUBPROTOCOL = "quizpulse.json.v1"
+
+
+def _default(obj: Any):
+    # Mongo documents carry ObjectIds; anything else unknown degrades to its string form
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    return str(obj)
+
+
+def encode(message: Any) -> str:
+    """Serialize an outbound WebSocket message to JSON text, once, for any number of sockets."""
+    if orjson is not None:
+        return orjson.dumps(message, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(message, default=_default, separators=(",", ":"))
+
+
+def decode(data: Union[str, bytes]) -> Any:
+    """Parse an inbound JSON text frame."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def negotiate_subprotocol(offered: List[str]) -> Optional[str]:
+    # The client lists protocols in order of preference; take the first we speak
+    for protocol in offered:
+        if protocol == MSGPACK_SUBPROTOCOL and msgpack is not None:
+            return protocol
+        if protocol == JSON_SUBPROTOCOL:
+            return protocol
+    return None
+
+
+def pack_text(text: str) -> bytes:
+    """
+    Re-encode an already-encoded JSON message as MessagePack.
+
+    Messages are built and spliced as JSON (see the pre-encoded question payloads), so
+    binary clients get the same values; this runs once per broadcast, not per socket.
+    """
+    return msgpack.packb(decode(text))
+
+
+def unpack(data: bytes) -> Any:
+    """Parse an inbound MessagePack frame."""
+    return msgpack.unpackb(data)
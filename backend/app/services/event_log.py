@@ -0,0 +1,246 @@
+from array import array
+from typing import Dict, List, Optional
+from pymongo import DeleteMany, DeleteOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.db.mongodb import get_database
+from app.services.room_state import Participant, Room
+
+logger = logging.getLogger(__name__)
+
+# Room fields captured by a snapshot; the quiz itself comes from the create event
+SNAPSHOT_FIELDS = (
+    "host_id", "status", "current_question", "question_started_at", "question_deadline", "roster_seq",
+)
+
+DUPLICATE_KEY = 11000
+
+
+class RoomEventLog:
+    """
+    Append-only log of room events in MongoDB, so a restarted worker can rebuild its rooms.
+
+      room_events     {_id: "{session_id}:{seq}", session_id, room_code, seq, kind, data, at}
+      room_snapshots  {_id: session_id, room_code, seq, state}
+
+    Kinds: create (quiz, mode, created_at), join (p), answer (p, q, o, s), submit (p),
+    start / state (fields), finish. The ConnectionManager owns what they mean; this class
+    only stores and loads them.
+
+    `append` is O(1) and never awaits Mongo. Events are group-committed every
+    ROOM_EVENT_FLUSH_INTERVAL_MS, so a crash loses at most that window. Once enough
+    events have accumulated (see snapshot_interval) a session is snapshotted and the
+    events it covers are pruned (except `create`), which keeps replay time bounded
+    however long the exam. Snapshots are stored packed, so their cost is a few joins
+    and one list per string column, not a dict per player.
+    """
+
+    def __init__(self):
+        self._pending: List[dict] = []
+        self._seqs: Dict[str, int] = {}
+        self._since_snapshot: Dict[str, int] = {}
+        self._last_snapshot: Dict[str, float] = {}
+        self._snapshot_due: Dict[str, tuple] = {}
+        self._dropped: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self.stats: Dict[str, int] = {
+            "events_appended": 0,
+            "events_written": 0,
+            "snapshots_written": 0,
+            "flush_errors": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Final flush; a second failure means Mongo is gone, so don't hang shutdown
+        await self.flush()
+        if self._pending:
+            await self.flush()
+
+    def append(self, room_code: str, room: Room, kind: str, **data):
+        session_id = room.session_id
+        if self._task is None or not session_id:
+            return
+        seq = self._seqs.get(session_id, 0) + 1
+        self._seqs[session_id] = seq
+        self._pending.append({
+            "_id": f"{session_id}:{seq}",
+            "session_id": session_id,
+            "room_code": room_code,
+            "seq": seq,
+            "kind": kind,
+            "data": data,
+            "at": time.time(),
+        })
+        self.stats["events_appended"] += 1
+        count = self._since_snapshot.get(session_id, 0) + 1
+        if count >= snapshot_interval(room):
+            now = time.monotonic()
+            if now - self._last_snapshot.get(session_id, 0.0) >= settings.ROOM_SNAPSHOT_MIN_INTERVAL_SECONDS:
+                count = 0
+                self._last_snapshot[session_id] = now
+                self._snapshot_due[session_id] = (room_code, room)
+        self._since_snapshot[session_id] = count
+
+    def drop(self, session_id: str):
+        # The room was evicted for good: forget its log so it is never recovered
+        self._seqs.pop(session_id, None)
+        self._since_snapshot.pop(session_id, None)
+        self._last_snapshot.pop(session_id, None)
+        self._snapshot_due.pop(session_id, None)
+        if self._task is not None:
+            self._dropped.add(session_id)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.ROOM_EVENT_FLUSH_INTERVAL_MS / 1000)
+            await self.flush()
+
+    async def flush(self):
+        batch, self._pending = self._pending, []
+        due, self._snapshot_due = self._snapshot_due, {}
+        dropped, self._dropped = self._dropped, set()
+        # Built before any await, so each snapshot matches exactly the seq it records
+        snapshots = [
+            snapshot_document(session_id, room_code, self._seqs[session_id], room)
+            for session_id, (room_code, room) in due.items()
+        ]
+        if not batch and not snapshots and not dropped:
+            return
+
+        try:
+            db = await get_database()
+            if batch:
+                try:
+                    await db["room_events"].insert_many(batch, ordered=False)
+                except BulkWriteError as e:
+                    # Events already written by a flush that failed halfway are fine
+                    if any(err.get("code") != DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+                        raise
+                self.stats["events_written"] += len(batch)
+                batch = []
+            if snapshots:
+                await db["room_snapshots"].bulk_write(
+                    [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in snapshots],
+                    ordered=False,
+                )
+                await db["room_events"].bulk_write(
+                    [
+                        DeleteMany({"session_id": doc["_id"], "seq": {"$lte": doc["seq"]}, "kind": {"$ne": "create"}})
+                        for doc in snapshots
+                    ],
+                    ordered=False,
+                )
+                self.stats["snapshots_written"] += len(snapshots)
+            if dropped:
+                # After the inserts, so events still buffered for these sessions go too
+                await db["room_events"].delete_many({"session_id": {"$in": list(dropped)}})
+                await db["room_snapshots"].bulk_write([DeleteOne({"_id": s}) for s in dropped], ordered=False)
+        except Exception as e:
+            self.stats["flush_errors"] += 1
+            logger.error(f"Room event log flush failed: {e}")
+            self._pending = batch + self._pending
+            for session_id, entry in due.items():
+                self._snapshot_due.setdefault(session_id, entry)
+            self._dropped |= dropped
+
+    async def load(self) -> List[dict]:
+        """
+        Everything needed to rebuild the latest session of every logged room code:
+        [{room_code, session_id, create, snapshot, events: [(kind, data)]}].
+        """
+        db = await get_database()
+        latest: Dict[str, dict] = {}
+        async for event in db["room_events"].find({"kind": "create"}).sort("at", 1):
+            latest[event["room_code"]] = event
+        if not latest:
+            return []
+
+        session_ids = [event["session_id"] for event in latest.values()]
+        snapshots = {
+            doc["_id"]: doc
+            async for doc in db["room_snapshots"].find({"_id": {"$in": session_ids}})
+        }
+        events: Dict[str, list] = {session_id: [] for session_id in session_ids}
+        cursor = db["room_events"].find({"session_id": {"$in": session_ids}, "kind": {"$ne": "create"}})
+        async for event in cursor.sort([("session_id", 1), ("seq", 1)]):
+            snapshot = snapshots.get(event["session_id"])
+            if snapshot is None or event["seq"] > snapshot["seq"]:
+                events[event["session_id"]].append(event)
+
+        records = []
+        for room_code, create in latest.items():
+            session_id = create["session_id"]
+            tail = events[session_id]
+            snapshot = snapshots.get(session_id)
+            # Continue numbering after whatever was logged last
+            self._seqs[session_id] = max(
+                [create["seq"]] + [e["seq"] for e in tail[-1:]] + ([snapshot["seq"]] if snapshot else [])
+            )
+            records.append({
+                "room_code": room_code,
+                "session_id": session_id,
+                "create": create["data"],
+                "snapshot": snapshot,
+                "events": [(e["kind"], e["data"]) for e in tail],
+            })
+        return records
+
+
+def snapshot_interval(room: Room) -> int:
+    # Events between snapshots, proportional to the room so each event pays O(1) of them
+    return max(
+        settings.ROOM_SNAPSHOT_EVERY_EVENTS,
+        len(room.participants) * settings.ROOM_SNAPSHOT_EVENTS_PER_PARTICIPANT,
+    )
+
+
+def snapshot_document(session_id: str, room_code: str, seq: int, room: Room) -> dict:
+    fields = room.fields(SNAPSHOT_FIELDS)
+    participants = list(room.participants.values())
+    # Columns rather than a document per player: answers are the players' packed
+    # array('b') buffers joined (question_count bytes each), scores an int64 array.
+    # Ids stay in a list, since they are arbitrary strings and may not be valid keys.
+    fields["players"] = {
+        "ids": [p.id for p in participants],
+        "nicknames": [p.nickname for p in participants],
+        "scores": array("q", [p.score for p in participants]).tobytes(),
+        "completed": bytes(p.completed for p in participants),
+        "answers": b"".join(p.answers.tobytes() for p in participants),
+    }
+    return {"_id": session_id, "room_code": room_code, "seq": seq, "state": fields}
+
+
+def restore_snapshot(room: Room, snapshot: dict):
+    fields = dict(snapshot["state"])
+    players = fields.pop("players")
+    room.update(fields)
+    width = room.question_count
+    answers = bytes(players["answers"])
+    scores = array("q")
+    scores.frombytes(bytes(players["scores"]))
+    for i, (player_id, nickname) in enumerate(zip(players["ids"], players["nicknames"])):
+        room.put_participant(Participant.from_packed(
+            player_id, nickname, answers[i * width:(i + 1) * width], scores[i], bool(players["completed"][i]),
+        ))
+
+
+event_log = RoomEventLog()
@@ -0,0 +1,166 @@
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+import asyncio
+import time
+
+from app.core.config import settings
+from app.services.encoding import decode, unpack
+
+# Command type -> (required payload fields and their accepted types, counts against the room bucket).
+# Unknown fields are ignored; bool is never accepted where an int is expected.
+COMMAND_SCHEMA: Dict[str, tuple] = {
+    "start_game": ({}, False),
+    "force_submit": ({}, False),
+    "submit_answer": ({"questionId": (str, int), "optionIdx": (int,)}, True),
+    "submit_test": ({}, True),
+    "sync_participants": ({}, True),
+}
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> bool:
+        # Refill lazily for the time since the last frame, then spend one token
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def retry_after(self) -> float:
+        # Seconds until the next frame would be admitted
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class Rejection(NamedTuple):
+    # `reason` names the stat the frame was counted under, minus "dropped_"; only rate
+    # limits are worth retrying, after `retry_after` seconds
+    reason: str
+    retry_after: Optional[float] = None
+
+    @property
+    def retryable(self) -> bool:
+        return self.retry_after is not None
+
+
+def frame_bytes(raw: Union[str, bytes]) -> int:
+    # Text frames are limited by their UTF-8 size, not their length in characters. A
+    # character is 1-4 bytes, so most frames are settled without encoding them.
+    if isinstance(raw, bytes) or len(raw) > settings.WS_MAX_FRAME_BYTES or len(raw) * 4 <= settings.WS_MAX_FRAME_BYTES:
+        return len(raw)
+    return len(raw.encode())
+
+
+def validate_command(message) -> Optional[dict]:
+    # The message if it is a known command with a well-formed payload, else None
+    if not isinstance(message, dict):
+        return None
+    command = message.get("type")
+    schema = COMMAND_SCHEMA.get(command) if isinstance(command, str) else None
+    if schema is None:
+        return None
+    payload = message.get("payload", {})
+    if not isinstance(payload, dict):
+        return None
+    for name, types in schema[0].items():
+        value = payload.get(name)
+        if not isinstance(value, types) or isinstance(value, bool):
+            return None
+    return message
+
+
+class InboundGuard:
+    """
+    Admission for inbound WebSocket frames, checked before anything reaches handle_command.
+
+    In order, cheapest first: frame size (WS_MAX_FRAME_BYTES), the socket's token bucket,
+    decoding, the command schema, then the room's shared bucket. A socket's bucket is
+    charged before decoding, so a flood of garbage costs a subtraction per frame rather
+    than a parse. Rejected frames are counted by reason and answered with a `rejected`
+    frame (see ConnectionManager.reject), so the client knows what did not arrive.
+
+    New connections are paced too (`pace_connection`), WS_ADMISSION_RATE_PER_SECOND
+    after a burst of WS_ADMISSION_BURST.
+    """
+
+    def __init__(self):
+        self._rooms: Dict[str, TokenBucket] = {}
+        # Admission time of the next connection (GCRA): each one waits for its own slot
+        self._next_admission = 0.0
+        self.stats: Dict[str, int] = {
+            "connections_admitted": 0,
+            "connections_paced": 0,
+            "frames_received": 0,
+            "dropped_oversize": 0,
+            "dropped_client_rate": 0,
+            "dropped_malformed": 0,
+            "dropped_invalid": 0,
+            "dropped_room_rate": 0,
+        }
+
+    async def pace_connection(self):
+        # FIFO and O(1): every caller reserves the next slot and sleeps at most once
+        now = time.monotonic()
+        interval = 1 / settings.WS_ADMISSION_RATE_PER_SECOND
+        slot = max(self._next_admission, now)
+        self._next_admission = slot + interval
+        self.stats["connections_admitted"] += 1
+        wait = slot - now - (settings.WS_ADMISSION_BURST - 1) * interval
+        if wait > 0:
+            self.stats["connections_paced"] += 1
+            await asyncio.sleep(wait)
+
+    def client_bucket(self) -> TokenBucket:
+        return TokenBucket(settings.WS_CLIENT_RATE_PER_SECOND, settings.WS_CLIENT_BURST)
+
+    def admit(
+        self, room_code: str, bucket: TokenBucket, raw: Optional[Union[str, bytes]], binary: bool
+    ) -> Tuple[Optional[dict], Optional[Rejection]]:
+        # (command, None) if admitted, else (None, why). `raw` is None for a frame of the
+        # wrong kind: binary on a JSON socket, or text on a MessagePack one
+        stats = self.stats
+        stats["frames_received"] += 1
+        if raw is not None and frame_bytes(raw) > settings.WS_MAX_FRAME_BYTES:
+            return None, self._reject("oversize")
+        now = time.monotonic()
+        if not bucket.take(now):
+            return None, self._reject("client_rate", bucket.retry_after())
+        if raw is None:
+            return None, self._reject("malformed")
+        try:
+            message = unpack(raw) if binary else decode(raw)
+        except (ValueError, TypeError):
+            # Malformed JSON or MessagePack
+            return None, self._reject("malformed")
+        message = validate_command(message)
+        if message is None:
+            return None, self._reject("invalid")
+        if COMMAND_SCHEMA[message["type"]][1]:
+            room_bucket = self._room_bucket(room_code)
+            if not room_bucket.take(now):
+                return None, self._reject("room_rate", room_bucket.retry_after())
+        return message, None
+
+    def _reject(self, reason: str, retry_after: Optional[float] = None) -> Rejection:
+        self.stats["dropped_" + reason] += 1
+        return Rejection(reason, retry_after)
+
+    def _room_bucket(self, room_code: str) -> TokenBucket:
+        bucket = self._rooms.get(room_code)
+        if bucket is None:
+            bucket = self._rooms[room_code] = TokenBucket(settings.WS_ROOM_RATE_PER_SECOND, settings.WS_ROOM_BURST)
+        return bucket
+
+    def forget_room(self, room_code: str):
+        # Called once a room has no local sockets left
+        self._rooms.pop(room_code, None)
+
+
+inbound_guard = InboundGuard()
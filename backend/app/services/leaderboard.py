@@ -0,0 +1,52 @@
+from typing import Dict, List, Optional, Tuple
+from sortedcontainers import SortedList
+
+
+class Leaderboard:
+    """
+    Players ordered by score, kept sorted as scores change.
+
+    Entries are (-score, player_id) keys in a SortedList, so a score change is an
+    O(log N) remove + add, a rank is an O(log N) bisect and the top K is an O(K) slice.
+    Ranks are competition ranks ("1224"): tied players share the better rank.
+    """
+
+    __slots__ = ("_entries", "_keys")
+
+    def __init__(self):
+        self._entries = SortedList()
+        self._keys: Dict[str, Tuple[int, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def update(self, player_id: str, score: int):
+        key = self._keys.get(player_id)
+        if key is not None:
+            if key[0] == -score:
+                return
+            self._entries.remove(key)
+        key = (-score, player_id)
+        self._keys[player_id] = key
+        self._entries.add(key)
+
+    def discard(self, player_id: str):
+        key = self._keys.pop(player_id, None)
+        if key is not None:
+            self._entries.remove(key)
+
+    def rank(self, player_id: str) -> Optional[int]:
+        key = self._keys.get(player_id)
+        if key is None:
+            return None
+        # (-score,) sorts before every (-score, player_id) key, so this counts higher scores
+        return self._entries.bisect_left((key[0],)) + 1
+
+    def top(self, k: int) -> List[Tuple[int, str, int]]:
+        # [(rank, player_id, score)] for the K best players, best first
+        top, rank, previous = [], 0, None
+        for position, (neg_score, player_id) in enumerate(self._entries.islice(0, k)):
+            if neg_score != previous:
+                rank, previous = position + 1, neg_score
+            top.append((rank, player_id, -neg_score))
+        return top
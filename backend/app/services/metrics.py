@@ -0,0 +1,122 @@
+from typing import Dict, Iterable
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import REGISTRY, Collector
+from pymongo import monitoring
+
+# Everything hot-path is a pre-bound child looked up in a plain dict: observing costs a
+# perf_counter pair and one lock, with no label resolution or allocation per call.
+
+COMMAND_TYPES = ("start_game", "submit_answer", "submit_test", "force_submit", "sync_participants")
+MONGO_COMMANDS = ("find", "insert", "update", "delete", "aggregate", "getMore", "count", "createIndexes")
+
+# WebSocket commands take well under a millisecond unless they wait on Redis
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+BYTES_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152)
+
+_command_duration = Histogram(
+    "quizpulse_command_duration_seconds", "handle_command time per WebSocket command type",
+    ["command"], buckets=LATENCY_BUCKETS,
+)
+COMMAND_DURATION: Dict[str, Histogram] = {
+    command: _command_duration.labels(command) for command in COMMAND_TYPES + ("other",)
+}
+
+BROADCAST_FANOUT_SECONDS = Histogram(
+    "quizpulse_broadcast_fanout_seconds", "Time to enqueue one broadcast to every local socket in a room",
+    buckets=LATENCY_BUCKETS,
+)
+BROADCAST_FRAME_BYTES = Histogram(
+    "quizpulse_broadcast_frame_bytes", "Encoded size of each broadcast frame", buckets=BYTES_BUCKETS,
+)
+BROADCAST_BYTES = Counter(
+    "quizpulse_broadcast_bytes", "Bytes enqueued by broadcasts (frame size x recipients)",
+)
+
+_mongo_duration = Histogram(
+    "quizpulse_mongo_command_duration_seconds", "MongoDB command round-trip time",
+    ["command"], buckets=LATENCY_BUCKETS,
+)
+MONGO_DURATION: Dict[str, Histogram] = {
+    command: _mongo_duration.labels(command) for command in MONGO_COMMANDS + ("other",)
+}
+_mongo_failures = Counter("quizpulse_mongo_command_failures", "MongoDB commands that failed", ["command"])
+MONGO_FAILURES: Dict[str, Counter] = {
+    command: _mongo_failures.labels(command) for command in MONGO_COMMANDS + ("other",)
+}
+
+
+def command_timer(command: str) -> Histogram:
+    # Unknown command types share one child so clients can't mint label values
+    return COMMAND_DURATION.get(command) or COMMAND_DURATION["other"]
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every MongoDB command issued through a client it is registered on."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        (MONGO_DURATION.get(event.command_name) or MONGO_DURATION["other"]).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        (MONGO_DURATION.get(event.command_name) or MONGO_DURATION["other"]).observe(event.duration_micros / 1e6)
+        (MONGO_FAILURES.get(event.command_name) or MONGO_FAILURES["other"]).inc()
+
+
+mongo_command_metrics = MongoCommandMetrics()
+
+
+class RuntimeCollector(Collector):
+    """
+    Reads the stats dicts the services already keep, at scrape time only.
+
+    Counters that are bumped per message (manager.stats, session_writer.stats, ...)
+    stay plain dict increments; this turns them into Prometheus samples on demand.
+    """
+
+    def __init__(self, manager, room_reaper, session_writer, event_log, quiz_cache, inbound_guard):
+        self.manager = manager
+        self.room_reaper = room_reaper
+        self.session_writer = session_writer
+        self.event_log = event_log
+        self.quiz_cache = quiz_cache
+        self.inbound_guard = inbound_guard
+
+    def collect(self) -> Iterable:
+        manager = self.manager
+        yield GaugeMetricFamily("quizpulse_rooms", "Rooms held by this worker", value=len(manager.room_states))
+        yield GaugeMetricFamily(
+            "quizpulse_sockets", "Open player WebSockets on this worker",
+            value=sum(len(sockets) for sockets in manager.active_connections.values()),
+        )
+        yield GaugeMetricFamily(
+            "quizpulse_rooms_estimated_bytes", "Estimated memory held by rooms, as of the last reaper sweep",
+            value=self.room_reaper.gauges["estimated_bytes"],
+        )
+        yield GaugeMetricFamily(
+            "quizpulse_session_write_queue_depth", "Answers waiting for the session write-behind flush",
+            value=self.session_writer.queue_depth(),
+        )
+
+        yield from self._counters("quizpulse_ws", "WebSocket delivery", manager.stats)
+        yield from self._counters("quizpulse_ws_inbound", "WebSocket inbound", self.inbound_guard.stats)
+        yield from self._counters("quizpulse_reaper", "Room reaper", self.room_reaper.stats)
+        yield from self._counters(
+            "quizpulse_session_writer", "Session write-behind", self.session_writer.stats,
+            gauges=("queue_high_water", "last_flush_ms"),
+        )
+        yield from self._counters("quizpulse_event_log", "Room event log", self.event_log.stats)
+        yield from self._counters("quizpulse_quiz_cache", "Quiz cache", self.quiz_cache.stats)
+
+    def _counters(self, prefix: str, subsystem: str, stats: Dict[str, int], gauges: tuple = ()):
+        for name, value in stats.items():
+            if name in gauges:
+                yield GaugeMetricFamily(f"{prefix}_{name}", f"{subsystem}: {name}", value=value)
+            else:
+                yield CounterMetricFamily(f"{prefix}_{name}", f"{subsystem}: {name}", value=value)
+
+
+def register_runtime_collector(manager, room_reaper, session_writer, event_log, quiz_cache, inbound_guard):
+    REGISTRY.register(RuntimeCollector(manager, room_reaper, session_writer, event_log, quiz_cache, inbound_guard))
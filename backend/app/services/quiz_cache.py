@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from bson import ObjectId
+import asyncio
+import time
+
+from app.core.config import settings
+from app.db.mongodb import get_database
+
+
+class _LoadAbandoned(Exception):
+    """The caller loading a key was cancelled; whoever was waiting on it loads instead."""
+
+
+class QuizCache:
+    """
+    Size-bounded LRU cache with a TTL for quiz documents read from MongoDB.
+
+    Concurrent misses for the same id share one lookup (single-flight), so 300 rooms
+    created for the same quiz at 9:00 cost one query. If the caller doing the lookup is
+    cancelled, the first of its waiters takes the lookup over; the others keep waiting.
+    Not-found results are cached too; `invalidate` must be called whenever a quiz is
+    created, changed or deleted. Cached documents are shared between callers and must
+    be treated as read-only.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Optional[dict]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        while True:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                return await self._load(key, loader)
+            self.stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(inflight)
+            except _LoadAbandoned:
+                # Only the loading caller was cancelled, not this one: go round again
+                continue
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            future.set_exception(_LoadAbandoned() if isinstance(e, asyncio.CancelledError) else e)
+            # Waiters re-raise it; mark it retrieved so an unawaited future doesn't warn
+            future.exception()
+            raise
+
+        # Only cache if nobody invalidated the key while we were loading
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+            self._store(key, value)
+        future.set_result(value)
+        return value
+
+    def _store(self, key: str, value: Optional[dict]):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+        self._inflight.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._inflight.clear()
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "size": len(self._entries)}
+
+
+quiz_cache = QuizCache(settings.QUIZ_CACHE_SIZE, settings.QUIZ_CACHE_TTL_SECONDS)
+
+
+async def fetch_quiz(quiz_id: str) -> Optional[dict]:
+    """Look a quiz up by ObjectId, falling back to a string _id, through the cache."""
+
+    async def load():
+        db = await get_database()
+        quiz = None
+        # Try finding by ObjectId
+        if ObjectId.is_valid(quiz_id):
+            quiz = await db["quizzes"].find_one({"_id": ObjectId(quiz_id)})
+        # Fallback to String ID if not found
+        if not quiz:
+            quiz = await db["quizzes"].find_one({"_id": quiz_id})
+        return quiz
+
+    return await quiz_cache.get(quiz_id, load)
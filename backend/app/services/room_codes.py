@@ -0,0 +1,70 @@
+from collections import deque
+from typing import Callable, Deque, Tuple
+import secrets
+import time
+
+from app.core.config import settings
+from app.services.sharding import shard_router
+
+CODE_DIGITS = 6
+CODE_SPACE = 10 ** CODE_DIGITS
+# The Feistel network permutes 20-bit integers (2^20 >= 10^6); results past the code
+# space are walked again ("cycle walking"), which keeps it a permutation of 0..10^6-1
+HALF_BITS = 10
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 4
+
+
+class RoomCodeAllocator:
+    """
+    Hands out 6-digit room codes in O(1), without the retry-until-free loop.
+
+    Fresh codes walk a keyed Feistel permutation of 0..999999 with a counter, so they
+    look random but never repeat until the whole space has been issued. Released codes
+    (reaped rooms) go on a FIFO free list and are reused once they have been free for
+    ROOM_CODE_REUSE_DELAY_SECONDS. Both are O(1); candidates this shard doesn't own are
+    skipped, about SHARD_COUNT draws per code.
+
+    Candidates are only unique among themselves: the caller still checks a code against
+    live rooms (recovered rooms never came from here) and, with Redis, claims it.
+    """
+
+    def __init__(self, owns: Callable[[str], bool]):
+        self.owns = owns
+        self._keys = [secrets.randbits(32) for _ in range(ROUNDS)]
+        # Random start, so restarted or parallel workers don't replay the same sequence
+        self._counter = secrets.randbelow(CODE_SPACE)
+        self._free: Deque[Tuple[float, str]] = deque()
+
+    def _round(self, r: int, half: int) -> int:
+        x = (half * 0x9E3779B1 + self._keys[r]) & 0xFFFFFFFF
+        x ^= x >> 15
+        x = (x * 0x85EBCA6B) & 0xFFFFFFFF
+        x ^= x >> 13
+        return x & HALF_MASK
+
+    def permute(self, index: int) -> int:
+        value = index
+        while True:
+            left, right = value >> HALF_BITS, value & HALF_MASK
+            for r in range(ROUNDS):
+                left, right = right, left ^ self._round(r, right)
+            value = (left << HALF_BITS) | right
+            if value < CODE_SPACE:
+                return value
+
+    def next_code(self) -> str:
+        while True:
+            if self._free and self._free[0][0] <= time.monotonic():
+                code = self._free.popleft()[1]
+            else:
+                code = str(self.permute(self._counter % CODE_SPACE)).zfill(CODE_DIGITS)
+                self._counter += 1
+            if self.owns(code):
+                return code
+
+    def release(self, room_code: str):
+        self._free.append((time.monotonic() + settings.ROOM_CODE_REUSE_DELAY_SECONDS, room_code))
+
+
+room_codes = RoomCodeAllocator(shard_router.owns)
@@ -0,0 +1,152 @@
+from typing import Dict, Optional
+import asyncio
+import logging
+import sys
+import time
+
+from app.core.config import settings
+from app.services.session_writer import session_writer
+from app.services.room_state import Room
+from app.services.websocket_manager import ConnectionManager, manager
+
+logger = logging.getLogger(__name__)
+
+# Rough per-object costs on CPython, measured with deep_sizeof (see benchmarks/room_memory.py)
+ROOM_BYTES = 512 # Room, its small fields and bookkeeping (the compiled quiz is shared)
+PARTICIPANT_BYTES = 408 # Participant with id/nickname strings and an empty answers array, plus its leaderboard entry
+ANSWER_BYTES = 1 # one packed answer slot per question
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(type(obj), "__slots__"):
+        size += sum(deep_sizeof(getattr(obj, name, None), seen) for name in type(obj).__slots__)
+    return size
+
+
+class RoomReaper:
+    """
+    Evicts idle rooms from a ConnectionManager so a long-running worker stays bounded.
+
+    Every ROOM_REAPER_INTERVAL_SECONDS it walks rooms least recently active first and:
+      - evicts rooms with no local sockets idle past the TTL for their status
+        (ROOM_TTL_LOBBY_SECONDS / ROOM_TTL_ACTIVE_SECONDS / ROOM_TTL_LEADERBOARD_SECONDS)
+      - then, while over ROOM_MAX_COUNT or ROOM_MAX_BYTES, evicts the least recently
+        active socketless rooms regardless of TTL
+
+    Rooms with connected players are never evicted. With ROOM_ARCHIVE_ON_EVICT the final
+    state goes to the session write-behind pipeline first. Memory is an estimate: compiled
+    quizzes are shared between rooms and counted once per revision.
+    """
+
+    def __init__(self, manager: ConnectionManager):
+        self.manager = manager
+        self._task: Optional[asyncio.Task] = None
+        # Measured once per quiz revision; dropped with the last room that uses it
+        self._quiz_bytes: Dict[str, int] = {}
+        self.stats: Dict[str, int] = {
+            "rooms_expired": 0,
+            "rooms_evicted": 0,
+            "rooms_archived": 0,
+            "sweeps": 0,
+        }
+        self.gauges: Dict[str, int] = {"live_rooms": 0, "sockets": 0, "estimated_bytes": 0}
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.ROOM_REAPER_INTERVAL_SECONDS)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Room reaper sweep failed: {e}")
+
+    def _ttl(self, room: Room) -> float:
+        if room.status == "lobby":
+            return settings.ROOM_TTL_LOBBY_SECONDS
+        if room.status == "leaderboard":
+            return settings.ROOM_TTL_LEADERBOARD_SECONDS
+        return settings.ROOM_TTL_ACTIVE_SECONDS
+
+    def sweep(self):
+        manager = self.manager
+        now = time.monotonic()
+        shortest_ttl = min(
+            settings.ROOM_TTL_LOBBY_SECONDS, settings.ROOM_TTL_ACTIVE_SECONDS, settings.ROOM_TTL_LEADERBOARD_SECONDS
+        )
+        for room_code, last_active in list(manager.last_active.items()):
+            if now - last_active < shortest_ttl:
+                break # Oldest first: nothing after this can have expired
+            room = manager.room_states.get(room_code)
+            if room_code in manager.active_connections or room is None:
+                continue
+            if now - last_active >= self._ttl(room):
+                self._evict(room_code)
+                self.stats["rooms_expired"] += 1
+
+        room_bytes = {code: self.estimate_room_bytes(room) for code, room in manager.room_states.items()}
+        total_bytes = sum(room_bytes.values()) + self._shared_quiz_bytes()
+        if len(manager.room_states) > settings.ROOM_MAX_COUNT or total_bytes > settings.ROOM_MAX_BYTES:
+            for room_code in list(manager.last_active):
+                if len(manager.room_states) <= settings.ROOM_MAX_COUNT and total_bytes <= settings.ROOM_MAX_BYTES:
+                    break
+                if room_code in manager.active_connections:
+                    continue
+                total_bytes -= room_bytes.get(room_code, 0)
+                self._evict(room_code)
+                self.stats["rooms_evicted"] += 1
+
+        self.stats["sweeps"] += 1
+        self.gauges["live_rooms"] = len(manager.room_states)
+        self.gauges["sockets"] = sum(len(sockets) for sockets in manager.active_connections.values())
+        self.gauges["estimated_bytes"] = sum(
+            room_bytes.get(code, 0) for code in manager.room_states
+        ) + self._shared_quiz_bytes()
+
+    def _evict(self, room_code: str):
+        room = self.manager.evict_room(room_code)
+        if room and settings.ROOM_ARCHIVE_ON_EVICT and room.session_id:
+            session_writer.mark_session(room_code, room)
+            self.stats["rooms_archived"] += 1
+
+    def estimate_room_bytes(self, room: Room) -> int:
+        # Answers are fixed-size arrays, so this is O(1) per room
+        return ROOM_BYTES + len(room.participants) * (PARTICIPANT_BYTES + ANSWER_BYTES * room.question_count)
+
+    def _shared_quiz_bytes(self) -> int:
+        # Compiled quizzes referenced by at least one room, each counted once
+        quizzes = {}
+        for room in self.manager.room_states.values():
+            if room.quiz_version not in quizzes:
+                quizzes[room.quiz_version] = room.quiz
+        for version in [v for v in self._quiz_bytes if v not in quizzes]:
+            del self._quiz_bytes[version]
+        for version, quiz in quizzes.items():
+            if version not in self._quiz_bytes:
+                self._quiz_bytes[version] = deep_sizeof(quiz)
+        return sum(self._quiz_bytes.values())
+
+    def snapshot(self) -> dict:
+        return {**self.gauges, **self.stats}
+
+
+room_reaper = RoomReaper(manager)
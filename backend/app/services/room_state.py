@@ -0,0 +1,230 @@
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.services.encoding import encode
+from app.services.leaderboard import Leaderboard
+
+# Answer slot of a question the participant has not answered
+UNANSWERED = -1
+# Answers are packed one signed byte per question
+MAX_OPTIONS = 127
+
+# Room attributes persisted/replicated as-is (see room_store.ROOM_FIELDS). The
+# leaderboard is not one of them: every copy rebuilds it from participant scores.
+STATE_FIELDS = (
+    "session_id", "created_at", "host_id", "status", "mode", "current_question", "question_started_at",
+    "question_deadline", "quiz_version", "roster_seq",
+)
+
+
+@dataclass(slots=True)
+class AnswerKey:
+    """
+    Per question: the correct option (-1 when none is marked) and the option count.
+    Archived with each session, so a finished exam is graded against the quiz as it
+    was played, even after the quiz is edited or deleted.
+    """
+
+    correct: array
+    option_counts: array
+
+    def __len__(self) -> int:
+        return len(self.correct)
+
+    def to_document(self) -> dict:
+        return {"correct": self.correct.tolist(), "option_counts": self.option_counts.tolist()}
+
+    @classmethod
+    def from_document(cls, doc: dict) -> "AnswerKey":
+        return cls(correct=array("b", doc["correct"]), option_counts=array("b", doc["option_counts"]))
+
+
+@dataclass(slots=True)
+class CompiledQuiz:
+    """
+    Everything a room needs from a quiz document, precomputed once per quiz revision
+    and shared by every room playing it. The raw Mongo document is not kept.
+    """
+
+    version: str
+    quiz_id: str
+    # Sanitized questions (no is_correct) and their pre-encoded forms
+    questions: List[dict]
+    questions_json: str
+    game_start: str
+    # Per question: correct option (-1 when none is marked), points, option count
+    correct: array
+    points: array
+    option_counts: array
+
+    def __len__(self) -> int:
+        return len(self.correct)
+
+    @property
+    def answer_key(self) -> AnswerKey:
+        return AnswerKey(correct=self.correct, option_counts=self.option_counts)
+
+
+def compile_quiz(quiz: dict) -> CompiledQuiz:
+    questions, correct, points, option_counts = [], array("b"), array("i"), array("b")
+    for idx, q in enumerate(quiz.get("questions", [])):
+        options = q.get("options", [])
+        questions.append({
+            "id": str(idx),
+            "text": q.get("text"),
+            "options": [{"text": o.get("text")} for o in options],
+            "timeLimit": q.get("time_limit", 30),
+        })
+        correct.append(next((i for i, o in enumerate(options) if o.get("is_correct")), UNANSWERED))
+        points.append(q.get("points", 100))
+        option_counts.append(min(len(options), MAX_OPTIONS))
+    questions_json = encode(questions)
+    return CompiledQuiz(
+        version=f"{quiz.get('_id')}:{quiz.get('updated_at')}",
+        quiz_id=str(quiz.get("_id", "")),
+        questions=questions,
+        questions_json=questions_json,
+        game_start='{"type":"game_start","payload":{"questions":' + questions_json + "}}",
+        correct=correct,
+        points=points,
+        option_counts=option_counts,
+    )
+
+
+@dataclass(slots=True)
+class Participant:
+    id: str
+    nickname: str
+    # answers[question_index] is the chosen option, or UNANSWERED
+    answers: array
+    score: int = 0
+    answered: int = 0
+    completed: bool = False
+
+    @classmethod
+    def new(cls, player_id: str, question_count: int) -> "Participant":
+        return cls(id=player_id, nickname=player_id, answers=array("b", [UNANSWERED]) * question_count)
+
+    def answer(self, q_idx: int) -> int:
+        return self.answers[q_idx]
+
+    def set_answer(self, q_idx: int, opt_idx: int):
+        if self.answers[q_idx] == UNANSWERED:
+            self.answered += 1
+        self.answers[q_idx] = opt_idx
+
+    def answers_dict(self) -> Dict[str, int]:
+        # Wire/storage form: {"questionId": optionIdx} for answered questions only
+        return {str(q): o for q, o in enumerate(self.answers) if o != UNANSWERED}
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "nickname": self.nickname,
+            "score": self.score,
+            "answers": self.answers_dict(),
+            "completed": self.completed,
+        }
+
+    def summary(self) -> dict:
+        # Compact progress counters instead of the full answers map
+        return {"id": self.id, "nickname": self.nickname, "answered": self.answered, "completed": self.completed}
+
+    @classmethod
+    def from_packed(cls, player_id: str, nickname: str, answers: bytes, score: int, completed: bool) -> "Participant":
+        # The inverse of a snapshot's packed columns (event_log.snapshot_document)
+        packed = array("b", answers)
+        return cls(
+            id=player_id, nickname=nickname, answers=packed, score=score,
+            answered=len(packed) - packed.count(UNANSWERED), completed=completed,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict, question_count: int) -> "Participant":
+        p = cls.new(data["id"], question_count)
+        p.nickname = data.get("nickname", data["id"])
+        p.score = data.get("score", 0)
+        p.completed = data.get("completed", False)
+        for q_id, opt_idx in data.get("answers", {}).items():
+            q_idx = int(q_id)
+            # Anything that doesn't fit the packed form (stored data from elsewhere) is dropped
+            if 0 <= q_idx < question_count and 0 <= opt_idx <= MAX_OPTIONS:
+                p.set_answer(q_idx, opt_idx)
+        return p
+
+
+@dataclass(slots=True)
+class Room:
+    quiz: CompiledQuiz
+    # Identifies this game in Mongo; room codes get reused, sessions don't
+    session_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    host_id: Optional[str] = None
+    status: str = "lobby"
+    # "exam": all questions at once, graded at force_submit
+    # "live": one timed question at a time, driven by the server
+    mode: str = "exam"
+    current_question: int = -1
+    # Wall-clock (epoch seconds) window of the open live question
+    question_started_at: Optional[float] = None
+    question_deadline: Optional[float] = None
+    participants: Dict[str, Participant] = field(default_factory=dict) # {player_id: participant}
+    roster_seq: int = 0
+    # Always in step with participant scores; change scores through set_score
+    leaderboard: Leaderboard = field(default_factory=Leaderboard)
+
+    @property
+    def quiz_version(self) -> str:
+        # Rooms of the same quiz revision share one compiled quiz
+        return self.quiz.version
+
+    @property
+    def question_count(self) -> int:
+        return len(self.quiz)
+
+    def add_participant(self, player_id: str) -> Participant:
+        participant = self.participants.get(player_id)
+        if participant is None:
+            participant = Participant.new(player_id, len(self.quiz))
+            self.participants[player_id] = participant
+            self.leaderboard.update(player_id, 0)
+        return participant
+
+    def put_participant(self, participant: Participant):
+        # Add or replace a participant loaded from elsewhere (store, snapshot, other worker)
+        self.participants[participant.id] = participant
+        self.leaderboard.update(participant.id, participant.score)
+
+    def set_score(self, participant: Participant, score: int):
+        participant.score = score
+        self.leaderboard.update(participant.id, score)
+
+    def standings(self, k: int) -> dict:
+        # Top K only: no answers, and a constant-size frame however big the room
+        return {
+            "leaderboard": [
+                {"rank": rank, "id": pid, "nickname": self.participants[pid].nickname, "score": score}
+                for rank, pid, score in self.leaderboard.top(k)
+            ],
+            "total": len(self.leaderboard),
+        }
+
+    def player_rank(self, player_id: str) -> Optional[dict]:
+        participant = self.participants.get(player_id)
+        if participant is None:
+            return None
+        return {
+            "rank": self.leaderboard.rank(player_id),
+            "score": participant.score,
+            "total": len(self.leaderboard),
+        }
+
+    def fields(self, names) -> dict:
+        return {name: getattr(self, name) for name in names}
+
+    def update(self, values: dict):
+        for name, value in values.items():
+            if name in STATE_FIELDS and name != "quiz_version":
+                setattr(self, name, value)
@@ -0,0 +1,212 @@
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+import json
+import logging
+import uuid
+
+from app.core.config import settings
+from app.services.encoding import encode
+
+logger = logging.getLogger(__name__)
+
+# Fields of a room state that are persisted as JSON; everything else is per-worker.
+# quiz_data is written once at creation so other workers can compile the quiz themselves.
+ROOM_FIELDS = (
+    "session_id", "created_at", "host_id", "status", "mode", "current_question", "question_started_at", "question_deadline",
+    "quiz_version", "quiz_data",
+)
+
+EventHandler = Callable[[str, dict], Awaitable[None]]
+
+
+class InMemoryRoomStore:
+    """
+    Default backend: `manager.room_states` in this process is the only copy of a room.
+
+    Every hook is a no-op, so a single worker behaves exactly as before.
+    """
+
+    shared = False
+
+    async def start(self, on_event: EventHandler):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def room_exists(self, room_code: str) -> bool:
+        return False
+
+    async def load_room(self, room_code: str) -> Optional[dict]:
+        return None
+
+    async def update(
+        self, room_code: str, fields: dict, participants: List[dict] = (), event: Optional[dict] = None
+    ):
+        pass
+
+    async def delete_room(self, room_code: str):
+        pass
+
+    async def claim_room_code(self, room_code: str) -> bool:
+        # Only this process allocates codes for its rooms; room_states is the whole truth
+        return True
+
+    async def next_roster_seq(self, room_code: str, current: int) -> int:
+        return current + 1
+
+    async def subscribe(self, room_code: str):
+        pass
+
+    async def unsubscribe(self, room_code: str):
+        pass
+
+
+class RedisRoomStore:
+    """
+    Shares rooms between uvicorn workers through Redis.
+
+    Layout per room:
+      quizpulse:room:{code}               hash of ROOM_FIELDS (JSON values) + roster_seq
+      quizpulse:room:{code}:participants  hash of player_id -> participant JSON
+      quizpulse:room:{code}               pub/sub channel of events from other workers
+      quizpulse:code:{code}               claim on the code by the worker that created the room
+
+    Every write refreshes the room's keys, code claim included, to expire
+    ROOM_STORE_TTL_SECONDS later, so a room that no worker touches any more (its last
+    worker reaped it or died) leaves Redis, and a code is free again only once its room is.
+
+    A worker subscribes to a room's channel while it holds at least one socket for it.
+    Events carry encoded messages to deliver locally plus any state they changed, so
+    each subscribed worker's `room_states` cache stays current.
+    """
+
+    shared = True
+
+    def __init__(self, client):
+        self.client = client
+        self.worker_id = uuid.uuid4().hex
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._on_event: Optional[EventHandler] = None
+
+    @staticmethod
+    def _room_key(room_code: str) -> str:
+        return f"quizpulse:room:{room_code}"
+
+    @staticmethod
+    def _participants_key(room_code: str) -> str:
+        return f"quizpulse:room:{room_code}:participants"
+
+    @staticmethod
+    def _code_key(room_code: str) -> str:
+        return f"quizpulse:code:{room_code}"
+
+    def _expire(self, pipe, room_code: str):
+        # EXPIRE on a key that doesn't exist yet is a no-op, so queue this after the writes
+        ttl = int(settings.ROOM_STORE_TTL_SECONDS)
+        pipe.expire(self._room_key(room_code), ttl)
+        pipe.expire(self._participants_key(room_code), ttl)
+        pipe.expire(self._code_key(room_code), ttl)
+
+    async def start(self, on_event: EventHandler):
+        self._on_event = on_event
+        self._pubsub = self.client.pubsub()
+        # A worker channel keeps the pub/sub connection open even with no rooms subscribed
+        await self._pubsub.subscribe(f"quizpulse:worker:{self.worker_id}")
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+        if self._pubsub:
+            await self._pubsub.aclose()
+
+    async def room_exists(self, room_code: str) -> bool:
+        return bool(await self.client.exists(self._room_key(room_code)))
+
+    async def load_room(self, room_code: str) -> Optional[dict]:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(self._room_key(room_code))
+        pipe.hvals(self._participants_key(room_code))
+        fields, participants = await pipe.execute()
+        if not fields:
+            return None
+        state = {k: json.loads(v) for k, v in fields.items() if k in ROOM_FIELDS}
+        state["roster_seq"] = int(fields.get("roster_seq", 0))
+        state["participants"] = {p["id"]: p for p in map(json.loads, participants)}
+        return state
+
+    async def update(
+        self, room_code: str, fields: dict, participants: List[dict] = (), event: Optional[dict] = None
+    ):
+        # Persist changed fields/participants and publish the event in one round trip
+        pipe = self.client.pipeline(transaction=False)
+        if fields:
+            pipe.hset(self._room_key(room_code), mapping={k: encode(v) for k, v in fields.items()})
+        if participants:
+            pipe.hset(
+                self._participants_key(room_code),
+                mapping={p["id"]: encode(p) for p in participants},
+            )
+        if event is not None:
+            event["origin"] = self.worker_id
+            pipe.publish(self._room_key(room_code), encode(event))
+        self._expire(pipe, room_code)
+        await pipe.execute()
+
+    async def delete_room(self, room_code: str):
+        await self.client.delete(self._room_key(room_code), self._participants_key(room_code))
+
+    async def claim_room_code(self, room_code: str) -> bool:
+        # SET NX: exactly one worker wins a code. The claim expires with the room's keys,
+        # which is when the code becomes reusable.
+        claimed = await self.client.set(
+            self._code_key(room_code), self.worker_id, nx=True, ex=int(settings.ROOM_STORE_TTL_SECONDS)
+        )
+        if not claimed:
+            return False
+        if await self.room_exists(room_code):
+            # A live room whose claim lapsed (written before claims were refreshed): the
+            # new claim now guards it, and the caller picks another code
+            return False
+        # Only leftovers of an expired room can remain, e.g. a participants hash
+        await self.delete_room(room_code)
+        return True
+
+    async def next_roster_seq(self, room_code: str, current: int) -> int:
+        # One counter per room across all workers, so deltas never reuse a seq. HINCRBY
+        # would recreate an expired room hash without a TTL, so it is refreshed here too.
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hincrby(self._room_key(room_code), "roster_seq", 1)
+        self._expire(pipe, room_code)
+        return (await pipe.execute())[0]
+
+    async def subscribe(self, room_code: str):
+        await self._pubsub.subscribe(self._room_key(room_code))
+
+    async def unsubscribe(self, room_code: str):
+        await self._pubsub.unsubscribe(self._room_key(room_code))
+
+    async def _listen(self):
+        prefix = len("quizpulse:room:")
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if not message or not message["channel"].startswith("quizpulse:room:"):
+                    continue
+                event = json.loads(message["data"])
+                if event.get("origin") == self.worker_id:
+                    continue
+                await self._on_event(message["channel"][prefix:], event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Room event listener error: {e}")
+                await asyncio.sleep(0.5)
+
+
+def create_room_store(backend: str, redis_client=None):
+    if backend == "redis":
+        return RedisRoomStore(redis_client)
+    return InMemoryRoomStore()
@@ -0,0 +1,89 @@
+from typing import Any, Callable, List, Optional
+import asyncio
+import heapq
+import itertools
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fire anything due within this window in the same pass (loop timers can wake a hair early)
+FIRE_TOLERANCE_SECONDS = 0.001
+
+
+class Deadline:
+    __slots__ = ("when", "callback", "args", "cancelled")
+
+    def __init__(self, when: float, callback: Callable, args: tuple):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        # Lazy deletion: the heap entry is skipped when it comes due
+        self.cancelled = True
+
+
+class DeadlineScheduler:
+    """
+    One heap of deadlines for the whole process, armed with a single loop timer.
+
+    Thousands of rooms each waiting on a question deadline cost one heap entry
+    apiece instead of one sleeping task apiece. Callbacks may be plain functions
+    or coroutine functions; coroutines run as tasks so a slow one never delays
+    the deadlines behind it. Times are event-loop times (`loop.time()`).
+    """
+
+    def __init__(self):
+        self._heap: List[tuple] = []
+        self._counter = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_when: Optional[float] = None
+        # Strong references to running callback tasks until they finish
+        self._tasks: set = set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def call_later(self, delay: float, callback: Callable, *args: Any) -> Deadline:
+        loop = asyncio.get_running_loop()
+        return self.call_at(loop.time() + max(delay, 0), callback, *args)
+
+    def call_at(self, when: float, callback: Callable, *args: Any) -> Deadline:
+        deadline = Deadline(when, callback, args)
+        heapq.heappush(self._heap, (when, next(self._counter), deadline))
+        if self._timer_when is None or when < self._timer_when:
+            self._arm(when)
+        return deadline
+
+    def _arm(self, when: float):
+        if self._timer:
+            self._timer.cancel()
+        self._timer_when = when
+        self._timer = asyncio.get_running_loop().call_at(when, self._fire)
+
+    def _fire(self):
+        self._timer = None
+        self._timer_when = None
+        loop = asyncio.get_running_loop()
+        now = loop.time() + FIRE_TOLERANCE_SECONDS
+        while self._heap and self._heap[0][0] <= now:
+            _, _, deadline = heapq.heappop(self._heap)
+            if deadline.cancelled:
+                continue
+            try:
+                result = deadline.callback(*deadline.args)
+                if asyncio.iscoroutine(result):
+                    task = loop.create_task(result)
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+            except Exception as e:
+                logger.error(f"Scheduled callback failed: {e}")
+        # Drop cancelled entries at the top so we never wake up just to skip them
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        if self._heap:
+            self._arm(self._heap[0][0])
+
+
+scheduler = DeadlineScheduler()
@@ -0,0 +1,259 @@
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.db.mongodb import get_database
+from app.services.event_log import DUPLICATE_KEY
+from app.services.room_state import Participant, Room
+
+logger = logging.getLogger(__name__)
+
+
+class SessionWriter:
+    """
+    Write-behind persistence of game sessions and answers to MongoDB.
+
+    The ConnectionManager only ever calls `record_answer` / `mark_session`, which are
+    O(1) and never await Mongo. A background task flushes when SESSION_WRITE_BATCH_SIZE
+    answers are waiting or every SESSION_WRITE_INTERVAL_SECONDS, with one unordered
+    bulk_write per collection:
+
+      session_answers       one document per answer event (append-only)
+      game_sessions         one small document per room session: quiz, host, status,
+                            and the answer key it was played with
+      session_participants  one document per player per session, `$set` in place
+
+    Session writes are coalesced: a session marked dirty 500 times between flushes
+    is written once, from its live state, at flush time, and only the players that
+    changed since the last flush are rewritten. A flush costs what changed, not the
+    size of the room, and no document grows with the number of players.
+
+    A failed flush keeps what it could not write for the next one, which waits an
+    exponentially growing delay (up to SESSION_WRITE_MAX_BACKOFF_SECONDS) rather than
+    retrying straight away.
+
+    `start(background=False)` accepts writes without the flush loop; `flush()` then
+    writes them on demand (tests, benchmarks). `sleep` is how the loop waits out a
+    back-off, and can be replaced to drive it without a real clock.
+    """
+
+    def __init__(self, sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        self._sleep = sleep
+        self._accepting = False
+        self._answers: Optional[asyncio.Queue] = None
+        # session_id -> (room_code, room, ids of players changed since the last flush)
+        self._dirty_sessions: Dict[str, Tuple[str, Room, Set[str]]] = {}
+        self._retry: List[InsertOne] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats: Dict[str, int] = {
+            "answers_enqueued": 0,
+            "answers_dropped": 0,
+            "answers_written": 0,
+            "sessions_written": 0,
+            "participants_written": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "queue_high_water": 0,
+            "last_flush_ms": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def queue_depth(self) -> int:
+        return self._answers.qsize() + len(self._retry) if self._answers else 0
+
+    async def start(self, background: bool = True):
+        self._answers = asyncio.Queue(maxsize=settings.SESSION_WRITE_QUEUE_SIZE)
+        self._wakeup = asyncio.Event()
+        self._accepting = True
+        if background:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Final flush on shutdown: everything accepted so far reaches Mongo
+        if not self._accepting:
+            return
+        self._accepting = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._answers.qsize() or self._dirty_sessions or self._retry:
+            if not await self.flush():
+                break # Mongo is unreachable; don't hang shutdown
+
+    def record_answer(
+        self, session_id: str, room_code: str, player_id: str,
+        question_index: int, option_index: int, correct: bool, received_at: float,
+    ):
+        if not self._accepting:
+            return
+        try:
+            self._answers.put_nowait(InsertOne({
+                "session_id": session_id,
+                "room_code": room_code,
+                "player_id": player_id,
+                "question_index": question_index,
+                "option_index": option_index,
+                "correct": correct,
+                "received_at": datetime.utcfromtimestamp(received_at),
+            }))
+        except asyncio.QueueFull:
+            # Backpressure: Mongo is not keeping up; the live state still has the answer
+            self.stats["answers_dropped"] += 1
+            return
+        self.stats["answers_enqueued"] += 1
+        depth = self._answers.qsize()
+        if depth > self.stats["queue_high_water"]:
+            self.stats["queue_high_water"] = depth
+        if depth >= settings.SESSION_WRITE_BATCH_SIZE:
+            self._wakeup.set()
+
+    def mark_session(self, room_code: str, room: Room, participants: Iterable[Participant] = ()):
+        # Keep references only; the documents are built at flush time
+        if not self._accepting or not room.session_id:
+            return
+        entry = self._dirty_sessions.get(room.session_id)
+        if entry is None:
+            entry = self._dirty_sessions[room.session_id] = (room_code, room, set())
+        entry[2].update(p.id for p in participants)
+
+    async def _run(self):
+        failures = 0
+        while True:
+            if failures:
+                await self._sleep(backoff_seconds(failures))
+            # Keep flushing back-to-back while a full batch is already waiting
+            elif self._answers.qsize() < settings.SESSION_WRITE_BATCH_SIZE:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), settings.SESSION_WRITE_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            failures = 0 if await self.flush() else failures + 1
+
+    async def flush(self) -> bool:
+        """One write round. False if anything was kept back for a retry."""
+        batch, self._retry = self._retry, []
+        while len(batch) < settings.SESSION_WRITE_BATCH_SIZE and not self._answers.empty():
+            batch.append(self._answers.get_nowait())
+        sessions, self._dirty_sessions = self._dirty_sessions, {}
+        if not batch and not sessions:
+            return True
+
+        started = time.perf_counter()
+        failed = False
+        try:
+            db = await get_database()
+            if batch:
+                batch = await self._write_answers(db, batch)
+                if batch:
+                    failed = True
+                    logger.error(f"Session write-behind: {len(batch)} answers not written, retrying")
+            if sessions:
+                await self._write_sessions(db, sessions)
+                sessions = {}
+        except Exception as e:
+            failed = True
+            logger.error(f"Session write-behind flush failed: {e}")
+        if failed:
+            self.stats["flush_errors"] += 1
+            # Retry on the next flush; sessions rebuild from live state, answers are kept
+            self._retry = batch[-settings.SESSION_WRITE_QUEUE_SIZE:]
+            self.stats["answers_dropped"] += len(batch) - len(self._retry)
+            for session_id, (room_code, room, player_ids) in sessions.items():
+                entry = self._dirty_sessions.setdefault(session_id, (room_code, room, set()))
+                entry[2].update(player_ids)
+        self.stats["flushes"] += 1
+        self.stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000)
+        return not failed
+
+    async def _write_answers(self, db, batch: List[InsertOne]) -> List[InsertOne]:
+        # Returns the operations that still have to be retried
+        try:
+            await db["session_answers"].bulk_write(batch, ordered=False)
+            failed = []
+        except BulkWriteError as e:
+            # pymongo gave every document its _id on the first send, so an answer that
+            # already landed (a network error after the server applied the batch, or a
+            # batch that failed halfway) comes back as a duplicate key: it is written.
+            retry = {
+                err["index"] for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY
+            }
+            failed = [batch[i] for i in sorted(retry)]
+        self.stats["answers_written"] += len(batch) - len(failed)
+        return failed
+
+    async def _write_sessions(self, db, sessions: Dict[str, Tuple[str, Room, Set[str]]]):
+        participant_ops = [
+            UpdateOne(
+                {"_id": f"{session_id}:{player_id}"},
+                {"$set": participant_document(session_id, room.participants[player_id])},
+                upsert=True,
+            )
+            for session_id, (_, room, player_ids) in sessions.items()
+            for player_id in player_ids
+            if player_id in room.participants
+        ]
+        # Players first: a session whose status says finished has all its players written
+        if participant_ops:
+            await db["session_participants"].bulk_write(participant_ops, ordered=False)
+            self.stats["participants_written"] += len(participant_ops)
+        await db["game_sessions"].bulk_write(
+            [
+                UpdateOne({"_id": session_id}, session_update(room_code, room), upsert=True)
+                for session_id, (room_code, room, _) in sessions.items()
+            ],
+            ordered=False,
+        )
+        self.stats["sessions_written"] += len(sessions)
+
+
+def backoff_seconds(failures: int) -> float:
+    # Doubling from the flush interval, capped; the exponent is bounded to stay a float
+    return min(
+        settings.SESSION_WRITE_INTERVAL_SECONDS * 2 ** min(failures, 16),
+        settings.SESSION_WRITE_MAX_BACKOFF_SECONDS,
+    )
+
+
+def session_update(room_code: str, room: Room) -> dict:
+    # Plain dicts, no model validation: this runs on the event loop for every dirty room
+    fields = {
+        "quiz_id": room.quiz.quiz_id,
+        "host_id": room.host_id or "",
+        "room_code": room_code,
+        "state": {"status": room.status, "current_question_index": room.current_question},
+    }
+    # A room plays one quiz revision, so its answer key is written once, with the session
+    on_insert = {"quiz_version": room.quiz.version, "answer_key": room.quiz.answer_key.to_document()}
+    if room.created_at is not None:
+        fields["created_at"] = room.created_at
+    else:
+        on_insert["created_at"] = datetime.utcnow()
+    return {"$set": fields, "$setOnInsert": on_insert}
+
+
+def participant_document(session_id: str, p: Participant) -> dict:
+    return {
+        "session_id": session_id,
+        "player_id": p.id,
+        "nickname": p.nickname,
+        "score": p.score,
+        "answers": p.answers_dict(),
+        "completed": p.completed,
+    }
+
+
+session_writer = SessionWriter()
@@ -0,0 +1,61 @@
+from bisect import bisect
+from typing import List, Optional
+import hashlib
+
+from app.core.config import settings
+
+# Close code telling a client to reconnect to the shard URL given as the close reason
+SHARD_REDIRECT_CLOSE_CODE = 4001
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hashing of keys onto `nodes` shards, with `vnodes` points per shard.
+
+    Growing from N to N+1 shards moves only ~1/(N+1) of the keys; a lookup is one hash
+    and one bisect.
+    """
+
+    def __init__(self, nodes: int, vnodes: int):
+        points = sorted((_hash(f"shard-{node}:{v}"), node) for node in range(nodes) for v in range(vnodes))
+        self._hashes = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: str) -> int:
+        return self._nodes[bisect(self._hashes, _hash(key)) % len(self._hashes)]
+
+
+class ShardRouter:
+    """
+    Which worker process owns a room code. With one shard (the default) it owns everything.
+
+    Rooms live only in their owner's memory: room_codes only hands out codes that hash to
+    this shard, and sockets for a room owned elsewhere are redirected to SHARD_URLS.
+    """
+
+    def __init__(self, count: int, index: int, urls: List[str], vnodes: int):
+        self.count = count
+        self.index = index
+        self.urls = urls
+        self.ring = HashRing(count, vnodes) if count > 1 else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ring is not None
+
+    def shard_for(self, room_code: str) -> int:
+        return self.ring.node_for(room_code) if self.ring else 0
+
+    def owns(self, room_code: str) -> bool:
+        return self.shard_for(room_code) == self.index
+
+    def url_for(self, room_code: str) -> Optional[str]:
+        shard = self.shard_for(room_code)
+        return self.urls[shard] if shard < len(self.urls) else None
+
+
+shard_router = ShardRouter(settings.SHARD_COUNT, settings.SHARD_INDEX, settings.SHARD_URLS, settings.SHARD_VNODES)
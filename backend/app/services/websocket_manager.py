@@ -1,206 +1,832 @@
-from typing import Dict, List
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
 from fastapi import WebSocket
+import asyncio
+import hashlib
+import hmac
 import json
 import logging
+import secrets
+import time
+
+from app.core.config import settings
+from app.services.client_connection import ClientConnection
+from app.services.encoding import MSGPACK_SUBPROTOCOL, encode, pack_text
+from app.services.event_log import event_log, restore_snapshot
+from app.services.inbound_guard import Rejection
+from app.services.metrics import BROADCAST_BYTES, BROADCAST_FANOUT_SECONDS, BROADCAST_FRAME_BYTES, command_timer
+from app.services.room_codes import room_codes
+from app.services.room_state import UNANSWERED, CompiledQuiz, Participant, Room, compile_quiz
+from app.services.room_store import ROOM_FIELDS, InMemoryRoomStore
+from app.services.scheduler import Deadline, scheduler
+from app.services.sharding import shard_router
+from app.services.session_writer import session_writer
+from bson import ObjectId
+from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 class ConnectionManager:
     def __init__(self):
-        # active_connections: {room_code: {player_id: WebSocket}}
-        self.active_connections: Dict[str, Dict[str, WebSocket]] = {}
-        
-        # room_state: {room_code: {status: str, quiz_data: dict, participants: list}}
-        self.room_states: Dict[str, dict] = {}
-
-    async def connect(self, room_code: str, player_id: str, websocket: WebSocket):
-        await websocket.accept()
-        if room_code not in self.active_connections:
-            self.active_connections[room_code] = {}
-            # Initialize room state if not exists (usually created by API, but just in case)
-            if room_code not in self.room_states:
-                self.room_states[room_code] = {"status": "lobby", "participants": []}
+        # active_connections: {room_code: {player_id: ClientConnection}}
+        self.active_connections: Dict[str, Dict[str, ClientConnection]] = {}
         
-        # Initialize participants list if missing
-        if "participants" not in self.room_states[room_code]:
-             self.room_states[room_code]["participants"] = []
+        # room_states: {room_code: Room}
+        self.room_states: Dict[str, Room] = {}
 
-        # Check if user already in list to avoid duplicates on reconnect
-        existing_user = next((p for p in self.room_states[room_code]["participants"] if p["id"] == player_id), None)
-        
-        if not existing_user:
-             # NTA-Style: Track answers map and completion status
-             new_participant = {
-                 "id": player_id, 
-                 "nickname": player_id, 
-                 "score": 0,
-                 "answers": {}, # {"questionId": optionIdx}
-                 "completed": False
-             }
-             self.room_states[room_code]["participants"].append(new_participant)
-
-        self.active_connections[room_code][player_id] = websocket
+        # Pending roster changes per room ({room_code: {player_id}}) and their scheduled flush
+        self._roster_changes: Dict[str, set] = {}
+        self._flush_handles: Dict[str, asyncio.TimerHandle] = {}
+        # Recent roster deltas per room ({room_code: deque[(seq, {player_id})]}), so a
+        # resuming client is sent what changed since its seq instead of the whole roster
+        self._roster_log: Dict[str, deque] = {}
+        self._resume_secret = (settings.RESUME_TOKEN_SECRET or secrets.token_hex(32)).encode()
+
+        # Live mode: the pending countdown/question/reveal deadline per room
+        self._room_deadlines: Dict[str, Deadline] = {}
+
+        # Compiled quizzes (sanitized, pre-encoded questions + answer key) per quiz version
+        self._compiled_quizzes: Dict[str, CompiledQuiz] = {}
+
+        # Outbound delivery counters, shared by every ClientConnection
+        self.stats: Dict[str, int] = {
+            "messages_sent": 0,
+            "messages_dropped": 0,
+            "send_failures": 0,
+            "send_timeouts": 0,
+            "consumers_evicted": 0,
+        }
+
+        # Per room: the in-flight first load (subscribe, then refresh from the store) that
+        # sockets arriving meanwhile wait on, and the subscription to the room's events.
+        # Subscribe/unsubscribe for a room run one at a time (see _sync_subscription).
+        self._room_loads: Dict[str, asyncio.Task] = {}
+        self._subscribed: set = set()
+        self._subscription_tasks: Dict[str, asyncio.Task] = {}
+        self._subscription_stale: set = set()
+        # Roster flushes and subscription changes, referenced until they finish
+        self._tasks: set = set()
+
+        # Last activity per room (monotonic), least recently active first; drives the reaper
+        self.last_active: "OrderedDict[str, float]" = OrderedDict()
+
+        # Where rooms are shared/persisted; swapped for Redis at startup when configured
+        self.store = InMemoryRoomStore()
+
+    async def use_store(self, store):
+        await store.start(self._on_remote_event)
+        self.store = store
+
+    async def allocate_room_code(self) -> str:
+        # Unique among this worker's rooms (including recovered ones) and, with a
+        # shared store, claimed across workers
+        while True:
+            room_code = room_codes.next_code()
+            if room_code in self.room_states or room_code in self.active_connections:
+                continue
+            if await self.store.claim_room_code(room_code):
+                return room_code
+
+    async def create_room(self, room_code: str, quiz: dict, mode: str = "exam"):
+        # Note: We are setting state in the Single Manager Instance (and the shared store)
+        room = Room(
+            quiz=self._compile(quiz), session_id=str(ObjectId()), created_at=datetime.utcnow(), mode=mode
+        )
+        self.room_states[room_code] = room
+        self.touch(room_code)
+        # Other workers compile their own copy from the quiz document
+        await self.store.update(
+            room_code, {k: quiz if k == "quiz_data" else getattr(room, k) for k in ROOM_FIELDS}
+        )
+        session_writer.mark_session(room_code, room)
+        event_log.append(room_code, room, "create", quiz=quiz, mode=mode, created_at=room.created_at)
+
+    def _room_from_stored(self, stored: dict) -> Room:
+        room = Room(quiz=self._compile(stored.get("quiz_data") or {}))
+        room.update({k: v for k, v in stored.items() if k != "participants"})
+        for p in stored.get("participants", {}).values():
+            room.put_participant(Participant.from_dict(p, room.question_count))
+        return room
+
+    async def recover_rooms(self) -> int:
+        # Rebuild rooms from the event log after a restart: create event, latest
+        # snapshot, then the events logged since it. Sharded, each worker takes its own rooms.
+        records = [r for r in await event_log.load() if shard_router.owns(r["room_code"])]
+        for record in records:
+            create = record["create"]
+            room = Room(
+                quiz=self._compile(create["quiz"]), session_id=record["session_id"],
+                created_at=create["created_at"], mode=create["mode"],
+            )
+            if record["snapshot"] is not None:
+                restore_snapshot(room, record["snapshot"])
+            for kind, data in record["events"]:
+                self._apply_event(room, kind, data)
+            self.room_states[record["room_code"]] = room
+            self.touch(record["room_code"])
+            self._resume_live_room(record["room_code"])
+        return len(records)
+
+    def touch(self, room_code: str):
+        self.last_active[room_code] = time.monotonic()
+        self.last_active.move_to_end(room_code)
+
+    def evict_room(self, room_code: str) -> Optional[Room]:
+        # Forget a room on this worker entirely (the reaper checks it has no sockets)
+        room = self.room_states.pop(room_code, None)
+        self.last_active.pop(room_code, None)
+        self._roster_changes.pop(room_code, None)
+        self._roster_log.pop(room_code, None)
+        handle = self._flush_handles.pop(room_code, None)
+        if handle:
+            handle.cancel()
+        self._clear_deadline(room_code)
+        if room and room.session_id:
+            event_log.drop(room.session_id)
+        if room and not self.store.shared:
+            # Shared rooms may live on elsewhere; their code claim lapses by itself
+            room_codes.release(room_code)
+        return room
+
+    def _apply_event(self, room: Room, kind: str, data: dict):
+        participants = room.participants
+        if kind == "join":
+            room.add_participant(data["p"])
+        elif kind == "answer":
+            p = participants.get(data["p"])
+            if p is not None:
+                p.set_answer(data["q"], data["o"])
+                room.set_score(p, data["s"])
+        elif kind == "submit":
+            if data["p"] in participants:
+                participants[data["p"]].completed = True
+        elif kind in ("start", "state"):
+            room.update(data["fields"])
+        elif kind == "finish":
+            room.status = "leaderboard"
+            for p in participants.values():
+                p.completed = True
+
+    def _resume_live_room(self, room_code: str):
+        # Re-arm the live-mode deadline a recovered room was waiting on
+        room = self.room_states[room_code]
+        if room.mode != "live":
+            return
+        if room.status == "countdown":
+            self._set_deadline(room_code, settings.LIVE_COUNTDOWN_SECONDS, self._open_question, 0)
+        elif room.status == "question_active":
+            self._set_deadline(room_code, room.question_deadline - time.time(), self._close_question, room.current_question)
+        elif room.status == "question_results":
+            self._set_deadline(room_code, settings.LIVE_REVEAL_SECONDS, self._open_question, room.current_question + 1)
+
+    def _log_state(self, room_code: str, kind: str, fields: tuple):
+        room = self.room_states[room_code]
+        event_log.append(room_code, room, kind, fields=room.fields(fields))
+
+    async def room_exists(self, room_code: str) -> bool:
+        if room_code in self.room_states or room_code in self.active_connections:
+            return True
+        return await self.store.room_exists(room_code)
+
+    async def connect(
+        self, room_code: str, player_id: str, websocket: WebSocket, subprotocol: Optional[str] = None,
+        resume: Optional[dict] = None,
+    ):
+        # `resume` ({token, roster_seq, questions}) comes from a client that was connected
+        # before: if the token checks out it gets only its own state and what it missed
+        await websocket.accept(subprotocol=subprotocol)
+        # Loops only if every other socket left again before this one got to register
+        while room_code not in self.active_connections:
+            await self._open_room(room_code)
+        self.touch(room_code)
+        room = self.room_states[room_code]
+
+        # Keyed by id, so a reconnect never creates a duplicate
+        new_participant = None
+        if player_id not in room.participants:
+             new_participant = room.add_participant(player_id)
+             event_log.append(room_code, room, "join", p=player_id)
+
+        previous = self.active_connections[room_code].get(player_id)
+        if previous:
+            # Same player reconnected on a new socket; retire the old one
+            previous.close()
+        connection = ClientConnection(
+            websocket,
+            self.stats,
+            on_evict=lambda conn: self.disconnect(room_code, player_id, conn.websocket),
+            binary=subprotocol == MSGPACK_SUBPROTOCOL,
+        )
+        self.active_connections[room_code][player_id] = connection
         logger.info(f"Player {player_id} connected to room {room_code}")
+        # Replicated only once the socket is registered: nothing above may await
+        if new_participant is not None:
+            await self._replicate(room_code, participants=[new_participant])
         
         # State Recovery: Send current state covering everything the user needs
-        start_payload = {}
-        state = self.room_states.get(room_code, {})
-        
-        if state.get("status") in ["active", "countdown"]:
-             # If game is running, send questions and their current answers
-             questions_sanitized = self._get_sanitized_questions(state.get("quiz_data", {}))
-             user_record = next((p for p in state["participants"] if p["id"] == player_id), {})
-             start_payload = {
-                 "questions": questions_sanitized,
-                 "my_answers": user_record.get("answers", {}),
-                 "status": state.get("status")
-             }
-
-        await self.send_personal_message(
-            {
-                "type": "state_sync", 
-                "payload": {**state, **start_payload}
-            }, 
-            websocket
-        )
+        # The joining client gets a full roster snapshot (or, resuming, the roster
+        # changes since its seq); everyone else gets a delta
+        resumed = self._can_resume(room, player_id, resume)
+        sync_payload = {
+            # Only client-safe fields: never the answer key
+            "status": room.status,
+            "current_question": room.current_question,
+            "leaderboard": [],
+            "resume_token": self.resume_token(room, player_id),
+        }
+        roster_delta = self._roster_since(room_code, room, resume.get("roster_seq")) if resumed else None
+        if roster_delta is not None:
+            sync_payload["roster_delta"] = roster_delta
+        else:
+            roster = self._roster_snapshot(room)
+            sync_payload["participants"] = roster["participants"]
+            sync_payload["roster_seq"] = roster["seq"]
+        if room.status == "leaderboard" or (room.mode == "live" and room.status != "lobby"):
+            # Standings are public once the game is over, and throughout a live game.
+            # The host of a finished game gets every player, for the results table.
+            sync_payload.update(room.standings(
+                len(room.leaderboard) if self._is_final_host(room, player_id) else settings.LEADERBOARD_TOP_K
+            ))
+            sync_payload["my_rank"] = room.player_rank(player_id)
 
-        # Broadcast participant list update to EVERYONE
-        await self.broadcast_participants(room_code)
+        if room.mode == "live" and room.status == "question_active":
+             # Live round in progress: just the open question and the time left on it
+             sync_payload["my_answers"] = room.participants[player_id].answers_dict()
+             sync_payload["question"] = room.quiz.questions[room.current_question]
+             sync_payload["timeLeft"] = max(room.question_deadline - time.time(), 0)
+             await self.send_personal_message(
+                 {"type": "state_sync", "payload": sync_payload},
+                 connection
+             )
+        elif room.mode != "live" and room.status in ["active", "countdown"] and resumed and resume.get("questions"):
+             # The client still holds the question set; just its answers
+             sync_payload["my_answers"] = room.participants[player_id].answers_dict()
+             await self.send_personal_message(
+                 {"type": "state_sync", "payload": sync_payload},
+                 connection
+             )
+        elif room.mode != "live" and room.status in ["active", "countdown"]:
+             # If game is running, send questions and their current answers.
+             # The questions are spliced in pre-encoded, so a reconnect storm
+             # only encodes each client's own small slice.
+             sync_payload["my_answers"] = room.participants[player_id].answers_dict()
+             await self.send_personal_encoded(
+                 '{"type":"state_sync","payload":{"questions":'
+                 + room.quiz.questions_json + "," + encode(sync_payload)[1:] + "}",
+                 connection
+             )
+        else:
+             await self.send_personal_message(
+                 {"type": "state_sync", "payload": sync_payload},
+                 connection
+             )
+
+        self.schedule_participants_update(room_code, player_id)
+
+
+    async def _open_room(self, room_code: str):
+        # First local socket for this room. Every socket that arrives while the load
+        # runs waits on the same one; shielded, so a socket that goes away mid-load
+        # doesn't cancel it for the others.
+        load = self._room_loads.get(room_code)
+        if load is None:
+            load = self._room_loads[room_code] = self._spawn(self._load_room(room_code))
+            load.add_done_callback(lambda _: self._room_loaded(room_code, load))
+        await asyncio.shield(load)
+
+    async def _load_room(self, room_code: str):
+        # Follow the room's events, then refresh our copy (another worker may have
+        # changed it while we were not subscribed)
+        await asyncio.shield(self._sync_subscription(room_code))
+        stored = await self.store.load_room(room_code)
+        if stored is not None:
+            self.room_states[room_code] = self._room_from_stored(stored)
+        # Initialize room state if not exists (usually created by API, but just in case)
+        if room_code not in self.room_states:
+            self.room_states[room_code] = Room(quiz=self._compile({}))
+        self.active_connections[room_code] = {}
+
+    def _room_loaded(self, room_code: str, load: asyncio.Task):
+        if self._room_loads.get(room_code) is load:
+            del self._room_loads[room_code]
+        if load.cancelled() or load.exception() is not None:
+            # Nothing was registered; give up the subscription the load may have taken
+            self._sync_subscription(room_code)
+
+    def _sync_subscription(self, room_code: str) -> asyncio.Task:
+        # Bring the room's subscription in line with whether this worker holds (or is
+        # opening) the room. Only one change runs per room at a time; a call while one
+        # runs makes it check again when it's done, so the last call always wins.
+        task = self._subscription_tasks.get(room_code)
+        if task is None:
+            task = self._subscription_tasks[room_code] = self._spawn(self._update_subscription(room_code))
+        else:
+            self._subscription_stale.add(room_code)
+        return task
+
+    async def _update_subscription(self, room_code: str):
+        try:
+            while True:
+                self._subscription_stale.discard(room_code)
+                wanted = room_code in self.active_connections or room_code in self._room_loads
+                if wanted and room_code not in self._subscribed:
+                    await self.store.subscribe(room_code)
+                    self._subscribed.add(room_code)
+                elif not wanted and room_code in self._subscribed:
+                    self._subscribed.discard(room_code)
+                    await self.store.unsubscribe(room_code)
+                if room_code not in self._subscription_stale:
+                    return
+        finally:
+            self._subscription_tasks.pop(room_code, None)
+            self._subscription_stale.discard(room_code)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
 
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Room task failed: {task.exception()}")
 
-    def disconnect(self, room_code: str, player_id: str):
+    def disconnect(self, room_code: str, player_id: str, websocket: WebSocket = None):
         if room_code in self.active_connections:
-            if player_id in self.active_connections[room_code]:
+            connection = self.active_connections[room_code].get(player_id)
+            # Ignore a stale socket if the player already reconnected on a new one
+            if connection and (websocket is None or connection.websocket is websocket):
+                connection.close()
                 del self.active_connections[room_code][player_id]
                 logger.info(f"Player {player_id} disconnected from room {room_code}")
+                # Leaves go out with the next coalesced roster delta, as "offline"
+                if room_code in self.room_states:
+                    self.schedule_participants_update(room_code, player_id)
             
             if not self.active_connections[room_code]:
                 del self.active_connections[room_code]
-                # We KEEP room_state for a while in a real app, but here maybe clean up
-                # if room_code in self.room_states: del self.room_states[room_code]
+                # Skipped if a socket comes back before the unsubscribe gets to run
+                self._sync_subscription(room_code)
+                # room_state is kept so players can rejoin; the reaper evicts it once idle
+                if room_code in self.room_states:
+                    self.touch(room_code)
 
-    async def send_personal_message(self, message: dict, websocket: WebSocket):
+    def resume_token(self, room: Room, player_id: str) -> str:
+        # Bound to the session, so a recycled room code never honours an old token
+        message = f"{room.session_id}:{player_id}".encode()
+        return hmac.new(self._resume_secret, message, hashlib.sha256).hexdigest()[:32]
+
+    def _can_resume(self, room: Room, player_id: str, resume: Optional[dict]) -> bool:
+        if not resume or player_id not in room.participants:
+            return False
+        return hmac.compare_digest(str(resume.get("token") or ""), self.resume_token(room, player_id))
+
+    async def send_personal_message(self, message: dict, connection: ClientConnection):
+        await self.send_personal_encoded(encode(message), connection)
+
+    async def send_personal_encoded(self, text: str, connection: ClientConnection):
+        if not connection.enqueue(pack_text(text) if connection.binary else text):
+            logger.error("Error sending personal message: connection closed or backed up")
+
+    async def reject(self, room_code: str, player_id: str, rejection: Rejection, frame=None):
+        # Nack for a frame the inbound guard turned away. A rate-limited text frame is
+        # echoed back as-is, so the client can resend it after `retry_after` seconds.
+        connection = self.active_connections.get(room_code, {}).get(player_id)
+        if connection is None:
+            return
+        payload = {"reason": rejection.reason}
+        if rejection.retryable:
+            payload["retry_after"] = round(rejection.retry_after, 3)
+            if isinstance(frame, str):
+                payload["frame"] = frame
+        await self.send_personal_message({"type": "rejected", "payload": payload}, connection)
+
+    async def handle_command(
+        self, room_code: str, player_id: str, message: dict, received_at: float = None
+    ):
+        started = time.perf_counter()
         try:
-            await websocket.send_json(message)
-        except Exception as e:
-            logger.error(f"Error sending personal message: {e}")
+            await self._handle_command(room_code, player_id, message, received_at)
+        finally:
+            command_timer(message.get("type")).observe(time.perf_counter() - started)
 
-    async def handle_command(self, room_code: str, player_id: str, message: dict):
+    async def _handle_command(
+        self, room_code: str, player_id: str, message: dict, received_at: float = None
+    ):
         if room_code not in self.room_states:
             return
 
         cmd_type = message.get("type")
         payload = message.get("payload", {})
-        state = self.room_states[room_code]
+        room = self.room_states[room_code]
+        self.touch(room_code)
+        # Server receive time; live-mode speed scoring is measured from this
+        received_at = received_at or time.time()
 
-        if cmd_type == "start_game":
+        if room.mode == "live" and cmd_type in ("start_game", "submit_answer", "force_submit"):
+            await self._handle_live_command(room_code, player_id, cmd_type, payload, received_at)
+
+        elif cmd_type == "start_game":
             # Host starts the test
-            state["status"] = "active"
-            self.room_states[room_code] = state
+            room.status = "active"
+            room.host_id = player_id
+            self._log_state(room_code, "start", ("status", "host_id"))
             
             # Broadcast FULL question set (sanitized) to all users
-            # Assuming quiz_data is set at room creation
-            questions = self._get_sanitized_questions(state.get("quiz_data", {}))
-            
-            await self.broadcast(room_code, {
-                "type": "game_start", 
-                "payload": { "questions": questions }
-            })
+            # The frame is built once per quiz version, when the quiz is compiled
+            await self.broadcast_encoded(room_code, room.quiz.game_start, fields=("status", "host_id"))
 
         elif cmd_type == "submit_answer":
             # User submits an answer for a specific question
             # Payload: { "questionId": "0", "optionIdx": 1 }
-            if state.get("status") != "active":
+            if room.status != "active":
                 return 
 
-            q_id = str(payload.get("questionId"))
-            opt_idx = payload.get("optionIdx")
-            
-            for p in state["participants"]:
-                if p["id"] == player_id:
-                    # Update their answer map
-                    p["answers"][q_id] = opt_idx
-                    break
+            p = room.participants.get(player_id)
+            q_idx, opt_idx = self._parse_answer(room, payload)
+            if p is None or q_idx is None:
+                return
+
+            # Update their answer and score incrementally: swap the old answer's
+            # points for the new one's, so force_submit has nothing left to grade
+            correct_idx = room.quiz.correct[q_idx]
+            points = room.quiz.points[q_idx]
+            previous = p.answer(q_idx)
+            score = p.score
+            if previous != UNANSWERED and previous == correct_idx:
+                score -= points
+            if opt_idx == correct_idx:
+                score += points
+            room.set_score(p, score)
+            p.set_answer(q_idx, opt_idx)
+            event_log.append(room_code, room, "answer", p=player_id, q=q_idx, o=opt_idx, s=p.score)
+            session_writer.record_answer(
+                room.session_id, room_code, player_id, q_idx, opt_idx,
+                opt_idx == correct_idx, received_at,
+            )
+            await self._replicate(room_code, participants=[p])
             
-            # Use 'state' update (no broadcast needed for every click, maybe just throttle stats)
-            # Maybe broadcast progress update to Host?
-            # Let's broadcast "participant_progress" only to Host? 
-            # For simplicity, broadcast participants list again so Host War Room updates
-            await self.broadcast_participants(room_code)
+            # Coalesced: the War Room gets at most one progress update per tick
+            self.schedule_participants_update(room_code, player_id)
 
         elif cmd_type == "submit_test":
             # User manually finishes test
-            for p in state["participants"]:
-                if p["id"] == player_id:
-                    p["completed"] = True
-                    break
-            await self.broadcast_participants(room_code)
+            p = room.participants.get(player_id)
+            if p is not None:
+                p.completed = True
+                event_log.append(room_code, room, "submit", p=player_id)
+                await self._replicate(room_code, participants=[p])
+            self.schedule_participants_update(room_code, player_id)
 
         elif cmd_type == "force_submit":
-            # Host ends the test for everyone. GRADING TIME.
-            state["status"] = "leaderboard"
-            
-            quiz_data = state.get("quiz_data", {})
-            questions = quiz_data.get("questions", [])
-            
-            # Grade everyone
-            for p in state["participants"]:
-                score = 0
-                user_answers = p.get("answers", {})
-                
-                # Iterate all questions
-                for i, q in enumerate(questions):
-                    q_id = str(i) # Using index as ID for now
-                    if q_id in user_answers:
-                        user_opt_idx = user_answers[q_id]
-                        options = q.get("options", [])
-                        if 0 <= user_opt_idx < len(options) and options[user_opt_idx].get("is_correct"):
-                            score += q.get("points", 100)
-                
-                p["score"] = score
-                p["completed"] = True
-            
-            self.room_states[room_code] = state
-            
-            # Sort leaderboard
-            sorted_participants = sorted(state.get("participants", []), key=lambda x: x["score"], reverse=True)
-            
+            # Host ends the test for everyone. Scores are already current; just finalize.
+            await self._finish_game(room_code)
+
+        elif cmd_type == "sync_participants":
+            # Client detected a gap in the roster seq; resend a full snapshot
+            connection = self.active_connections.get(room_code, {}).get(player_id)
+            if connection:
+                await self.send_personal_message(
+                    {"type": "participant_snapshot", "payload": self._roster_snapshot(room)},
+                    connection
+                )
+
+    def _parse_answer(self, room: Room, payload: dict) -> tuple:
+        # (question_index, option_index) if both are in range for this quiz, else (None, None)
+        try:
+            q_idx = int(payload.get("questionId"))
+        except (TypeError, ValueError):
+            return None, None
+        opt_idx = payload.get("optionIdx")
+        if not 0 <= q_idx < room.question_count:
+            return None, None
+        if not isinstance(opt_idx, int) or not 0 <= opt_idx < room.quiz.option_counts[q_idx]:
+            return None, None
+        return q_idx, opt_idx
+
+    async def _finish_game(self, room_code: str):
+        room = self.room_states[room_code]
+        room.status = "leaderboard"
+        event_log.append(room_code, room, "finish")
+        participants = list(room.participants.values())
+        for p in participants:
+            p.completed = True
+
+        # The leaderboard is already sorted; everyone gets the top K and their own rank
+        await self.broadcast(room_code, {
+            "type": "game_over",
+            "payload": room.standings(settings.LEADERBOARD_TOP_K)
+        }, fields=("status",), participants=participants, ranks=True)
+
+    # --- Live mode: server-timed rounds -------------------------------------------------
+    #
+    # start_game -> countdown -> new_question (answer window open) -> question_result
+    # (reveal) -> next new_question ... -> game_over. Every transition is a deadline on
+    # the shared scheduler; only the worker that ran start_game drives the room.
+
+    async def _handle_live_command(
+        self, room_code: str, player_id: str, cmd_type: str, payload: dict, received_at: float
+    ):
+        room = self.room_states[room_code]
+
+        if cmd_type == "start_game":
+            if room.status != "lobby":
+                return
+            room.status = "countdown"
+            room.host_id = player_id
+            self._log_state(room_code, "start", ("status", "host_id"))
             await self.broadcast(room_code, {
-                "type": "game_over", 
-                "payload": { "leaderboard": sorted_participants }
-            })
+                "type": "countdown",
+                "payload": {"seconds": settings.LIVE_COUNTDOWN_SECONDS}
+            }, fields=("status", "host_id"))
+            self._set_deadline(room_code, settings.LIVE_COUNTDOWN_SECONDS, self._open_question, 0)
 
-    async def broadcast(self, room_code: str, message: dict, exclude_player: str = None):
-        if room_code in self.active_connections:
-            for player_id, connection in self.active_connections[room_code].items():
-                if player_id != exclude_player:
-                    try:
-                        await connection.send_json(message)
-                    except Exception:
-                         pass
+        elif cmd_type == "submit_answer":
+            # One answer per player per question, only while the window is open
+            if room.status != "question_active":
+                return
+            p = room.participants.get(player_id)
+            q_idx, opt_idx = self._parse_answer(room, payload)
+            if p is None or q_idx != room.current_question:
+                return
+            if p.answer(q_idx) != UNANSWERED or received_at > room.question_deadline:
+                return
 
-    async def broadcast_participants(self, room_code: str):
-        if room_code in self.room_states:
-             await self.broadcast(
-                room_code, 
-                {
-                    "type": "participant_update", 
-                    "payload": self.room_states[room_code]["participants"]
-                }
+            correct_idx = room.quiz.correct[q_idx]
+            if opt_idx == correct_idx:
+                room.set_score(p, p.score + self._speed_points(
+                    room.quiz.points[q_idx], received_at - room.question_started_at,
+                    room.question_deadline - room.question_started_at,
+                ))
+            p.set_answer(q_idx, opt_idx)
+            event_log.append(room_code, room, "answer", p=player_id, q=q_idx, o=opt_idx, s=p.score)
+            session_writer.record_answer(
+                room.session_id, room_code, player_id, q_idx, opt_idx,
+                opt_idx == correct_idx, received_at,
             )
+            await self._replicate(room_code, participants=[p])
+            self.schedule_participants_update(room_code, player_id)
+
+        elif cmd_type == "force_submit":
+            self._clear_deadline(room_code)
+            await self._finish_game(room_code)
+
+    def _set_deadline(self, room_code: str, delay: float, callback, *args):
+        self._clear_deadline(room_code)
+        self._room_deadlines[room_code] = scheduler.call_later(delay, callback, room_code, *args)
+
+    def _clear_deadline(self, room_code: str):
+        deadline = self._room_deadlines.pop(room_code, None)
+        if deadline:
+            deadline.cancel()
 
-    def _get_sanitized_questions(self, quiz_data: dict) -> list:
-        # Helper to strip is_correct
-        safe_questions = []
-        raw_questions = quiz_data.get("questions", [])
-        for idx, q in enumerate(raw_questions):
-            safe_q = {
-                "id": str(idx),
-                "text": q.get("text"),
-                "options": [{"text": o.get("text")} for o in q.get("options", [])],
-                "timeLimit": q.get("time_limit", 30)
+    async def _open_question(self, room_code: str, q_idx: int):
+        self._room_deadlines.pop(room_code, None)
+        room = self.room_states.get(room_code)
+        if room is None or room.status == "leaderboard":
+            return
+        if q_idx >= room.question_count:
+            await self._finish_game(room_code)
+            return
+        question = room.quiz.questions[q_idx]
+        time_limit = question["timeLimit"]
+        now = time.time()
+        room.status = "question_active"
+        room.current_question = q_idx
+        room.question_started_at = now
+        room.question_deadline = now + time_limit
+        self._log_state(room_code, "state", ("status", "current_question", "question_started_at", "question_deadline"))
+        await self.broadcast(room_code, {
+            "type": "new_question",
+            "payload": {
+                "index": q_idx,
+                "total": room.question_count,
+                "question": question,
+                "timeLimit": time_limit,
             }
-            safe_questions.append(safe_q)
-        return safe_questions
+        }, fields=("status", "current_question", "question_started_at", "question_deadline"))
+        self._set_deadline(room_code, time_limit, self._close_question, q_idx)
+
+    async def _close_question(self, room_code: str, q_idx: int):
+        self._room_deadlines.pop(room_code, None)
+        room = self.room_states.get(room_code)
+        if room is None or room.current_question != q_idx or room.status != "question_active":
+            return
+        room.status = "question_results"
+        self._log_state(room_code, "state", ("status",))
+        await self.broadcast(room_code, {
+            "type": "question_result",
+            "payload": {"index": q_idx, "correct_option": room.quiz.correct[q_idx]}
+        }, fields=("status",))
+        # Running standings after every reveal; scores are already ranked as answers came in
+        await self.broadcast(room_code, {
+            "type": "leaderboard_update",
+            "payload": room.standings(settings.LEADERBOARD_TOP_K)
+        }, ranks=True)
+
+        if q_idx + 1 < room.question_count:
+            self._set_deadline(room_code, settings.LIVE_REVEAL_SECONDS, self._open_question, q_idx + 1)
+        else:
+            self._set_deadline(room_code, settings.LIVE_REVEAL_SECONDS, self._finish_live_game)
+
+    async def _finish_live_game(self, room_code: str):
+        self._room_deadlines.pop(room_code, None)
+        if room_code in self.room_states and self.room_states[room_code].status != "leaderboard":
+            await self._finish_game(room_code)
+
+    def _speed_points(self, points: int, elapsed: float, window: float) -> int:
+        # Full points for an instant answer, sliding linearly to half at the deadline
+        if window <= 0:
+            return points
+        fraction = min(max(elapsed / window, 0.0), 1.0)
+        return round(points * (1 - fraction / 2))
+
+    async def broadcast(
+        self, room_code: str, message: dict, exclude_player: str = None,
+        fields: tuple = (), participants: list = (), ranks: bool = False,
+    ):
+        # `fields`/`participants` name the state this message changed, for other workers.
+        # `ranks` follows the broadcast with each player's own leaderboard position.
+        if room_code in self.active_connections or self.store.shared:
+            await self.broadcast_encoded(
+                room_code, encode(message), exclude_player, fields, participants, ranks
+            )
+
+    async def broadcast_encoded(
+        self, room_code: str, text: str, exclude_player: str = None,
+        fields: tuple = (), participants: list = (), ranks: bool = False,
+    ):
+        self._deliver_local(room_code, text, exclude_player)
+        if ranks:
+            await self._send_ranks(room_code)
+        await self._replicate(room_code, fields, participants, text, exclude_player, ranks)
+
+    async def _send_ranks(self, room_code: str):
+        # One small personal frame per local player: an O(log N) rank lookup each
+        room = self.room_states.get(room_code)
+        if room is None:
+            return
+        for player_id, connection in list(self.active_connections.get(room_code, {}).items()):
+            rank = room.player_rank(player_id)
+            if rank is not None:
+                await self.send_personal_message({"type": "your_rank", "payload": rank}, connection)
+            if self._is_final_host(room, player_id):
+                # Players get the top K; whichever worker holds the host's socket sends it
+                # every player once the game is over
+                await self.send_personal_message(
+                    {"type": "final_standings", "payload": room.standings(len(room.leaderboard))}, connection
+                )
+
+    def _is_final_host(self, room: Room, player_id: str) -> bool:
+        return room.status == "leaderboard" and player_id == room.host_id
+
+    def _deliver_local(self, room_code: str, text: str, exclude_player: str = None):
+        # Enqueue only; each connection's writer task delivers concurrently with the rest.
+        # Copy the items since a full queue evicts (and unregisters) its connection.
+        started = time.perf_counter()
+        packed = None
+        sent_bytes = 0
+        for player_id, connection in list(self.active_connections.get(room_code, {}).items()):
+            if player_id == exclude_player:
+                continue
+            if connection.binary:
+                # Encoded once per broadcast, and only if a binary client is listening
+                if packed is None:
+                    packed = pack_text(text)
+                connection.enqueue(packed)
+                sent_bytes += len(packed)
+            else:
+                connection.enqueue(text)
+                sent_bytes += len(text)
+        BROADCAST_FANOUT_SECONDS.observe(time.perf_counter() - started)
+        BROADCAST_FRAME_BYTES.observe(len(text))
+        BROADCAST_BYTES.inc(sent_bytes)
+
+    async def _replicate(
+        self, room_code: str, fields: tuple = (), participants: list = (),
+        text: str = None, exclude_player: str = None, ranks: bool = False,
+    ):
+        # Persist changed state and fan the event out to other workers (no-op in memory)
+        room = self.room_states.get(room_code)
+        if room is not None and (fields or participants):
+            session_writer.mark_session(room_code, room, participants)
+        if not self.store.shared:
+            return
+        changed = room.fields(fields) if room is not None else {}
+        participant_dicts = [p.to_dict() for p in participants]
+        event = {
+            "state": {**changed, "roster_seq": room.roster_seq if room is not None else 0},
+            "participants": participant_dicts,
+            "text": text,
+            "exclude": exclude_player,
+            "ranks": ranks,
+        }
+        await self.store.update(room_code, changed, participant_dicts, event)
+
+    async def _on_remote_event(self, room_code: str, event: dict):
+        # Another worker changed this room: update our copy, then deliver to our sockets
+        room = self.room_states.get(room_code)
+        if room is not None:
+            self.touch(room_code)
+            fields = dict(event.get("state", {}))
+            room.roster_seq = max(room.roster_seq, fields.pop("roster_seq", 0))
+            room.update(fields)
+            for p in event.get("participants", ()):
+                room.put_participant(Participant.from_dict(p, room.question_count))
+        if event.get("text"):
+            self._deliver_local(room_code, event["text"], event.get("exclude"))
+        if event.get("ranks"):
+            await self._send_ranks(room_code)
+
+    async def broadcast_participants(self, room_code: str):
+        # Flush pending roster changes (joins, progress, leaves) as one delta
+        changes = self._roster_changes.pop(room_code, None)
+        room = self.room_states.get(room_code)
+        if not changes or room is None:
+            return
+
+        room.roster_seq = await self.store.next_roster_seq(room_code, room.roster_seq)
+        log = self._roster_log.get(room_code)
+        if log is None:
+            log = self._roster_log[room_code] = deque(maxlen=settings.ROSTER_LOG_SIZE)
+        log.append((room.roster_seq, changes))
+        await self.broadcast(
+            room_code,
+            {
+                "type": "participant_delta",
+                "payload": self._roster_delta(room_code, room, changes)
+            }
+        )
+
+    def _roster_delta(self, room_code: str, room: Room, player_ids) -> dict:
+        # {seq, changed, removed, offline}: summaries of changed players, ids of players no
+        # longer in the room, and ids of changed players with no socket on this worker
+        index = room.participants
+        local = self.active_connections.get(room_code, {})
+        return {
+            "seq": room.roster_seq,
+            "changed": [index[pid].summary() for pid in player_ids if pid in index],
+            "removed": [pid for pid in player_ids if pid not in index],
+            "offline": [pid for pid in player_ids if pid in index and pid not in local],
+        }
+
+    def _roster_since(self, room_code: str, room: Room, since) -> Optional[dict]:
+        # One delta covering everything after `since`, or None if the log doesn't reach
+        # back that far (or has gaps: seqs allocated by other workers), meaning: snapshot
+        if not isinstance(since, int) or since > room.roster_seq:
+            return None
+        player_ids = set()
+        expected = since + 1
+        for seq, changes in self._roster_log.get(room_code, ()):
+            if seq <= since:
+                continue
+            if seq != expected:
+                return None
+            player_ids |= changes
+            expected += 1
+        if expected != room.roster_seq + 1:
+            return None
+        return self._roster_delta(room_code, room, player_ids)
+
+    def schedule_participants_update(self, room_code: str, player_id: str):
+        # Record the change; everything within one tick goes out as a single delta
+        self._roster_changes.setdefault(room_code, set()).add(player_id)
+        if room_code in self._flush_handles:
+            return
+        loop = asyncio.get_running_loop()
+        self._flush_handles[room_code] = loop.call_later(
+            settings.ROSTER_FLUSH_INTERVAL_MS / 1000,
+            lambda: self._spawn(self._flush_participants(room_code)),
+        )
+
+    async def _flush_participants(self, room_code: str):
+        self._flush_handles.pop(room_code, None)
+        await self.broadcast_participants(room_code)
+
+    def _roster_snapshot(self, room: Room) -> dict:
+        # Full roster at the room's current seq; deltas after it apply on top
+        return {
+            "seq": room.roster_seq,
+            "participants": [p.summary() for p in room.participants.values()],
+        }
+
+    def _compile(self, quiz: dict) -> CompiledQuiz:
+        # Sanitize, encode and index once per quiz revision; rooms share the result
+        version = f"{quiz.get('_id')}:{quiz.get('updated_at')}"
+        compiled = self._compiled_quizzes.get(version)
+        if compiled is None:
+            compiled = compile_quiz(quiz)
+            if len(self._compiled_quizzes) >= settings.QUESTION_CACHE_SIZE:
+                # Evict the oldest entry (dicts keep insertion order); rooms keep their reference
+                del self._compiled_quizzes[next(iter(self._compiled_quizzes))]
+            self._compiled_quizzes[version] = compiled
+        return compiled
+
+    def invalidate_quiz(self, quiz_id: str):
+        # Drop compiled copies of every revision of a quiz that changed or was deleted
+        prefix = f"{quiz_id}:"
+        for version in [v for v in self._compiled_quizzes if v.startswith(prefix)]:
+            del self._compiled_quizzes[version]
 
 manager = ConnectionManager()
@@ -0,0 +1,103 @@
+"""
+Item analysis benchmark: the vectorized analytics module vs the same statistics computed
+with Python loops over participants.
+
+Builds a finished room of PLAYERS participants x QUESTIONS questions with answers driven
+by a per-player skill, so the discrimination index has something to find. Times
+answer_matrix + item_analysis against a loop implementation of percent correct, option
+distribution and the upper/lower-27% discrimination index, checks they agree, and prints
+a JSON report.
+
+    python -m benchmarks.analytics --players 10000 --questions 100
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from app.services.analytics import DISCRIMINATION_GROUP, answer_matrix, item_analysis
+from app.services.room_state import Room, compile_quiz
+
+
+def make_room(players: int, questions: int, options: int = 4) -> Room:
+    quiz = {
+        "_id": "bench-quiz",
+        "questions": [
+            {
+                "text": f"Question {q}",
+                "options": [{"text": f"Option {o}", "is_correct": o == q % options} for o in range(options)],
+                "points": 10,
+            }
+            for q in range(questions)
+        ],
+    }
+    room = Room(quiz=compile_quiz(quiz), status="leaderboard")
+    for n in range(players):
+        p = room.add_participant(f"student-{n:05d}")
+        skill = random.random()
+        for q in range(questions):
+            if random.random() < 0.95:
+                o = q % options if random.random() < skill else random.randrange(options)
+                p.set_answer(q, o)
+                if o == q % options:
+                    room.set_score(p, p.score + 10)
+    return room
+
+
+def loop_analysis(room: Room) -> dict:
+    # The straightforward version: one pass over participants per question and option
+    participants = list(room.participants.values())
+    key, counts = room.quiz.correct, room.quiz.option_counts
+    ranked = sorted(participants, key=lambda p: p.score)
+    group = max(1, round(len(participants) * DISCRIMINATION_GROUP))
+    items = []
+    for q in range(room.question_count):
+        upper = sum(p.answer(q) == key[q] for p in ranked[-group:]) / group
+        lower = sum(p.answer(q) == key[q] for p in ranked[:group]) / group
+        items.append({
+            "percent_correct": sum(p.answer(q) == key[q] for p in participants) / len(participants) * 100,
+            "options": [sum(p.answer(q) == o for p in participants) for o in range(counts[q])],
+            "discrimination": upper - lower,
+        })
+    return {"items": items}
+
+
+def main(args):
+    random.seed(args.seed)
+    room = make_room(args.players, args.questions)
+    participants = list(room.participants.values())
+
+    started = time.perf_counter()
+    answers = answer_matrix(participants, room.question_count)
+    scores = np.array([p.score for p in participants])
+    vectorized = item_analysis(answers, scores, room.quiz.answer_key)
+    vectorized_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    looped = loop_analysis(room)
+    loop_ms = (time.perf_counter() - started) * 1000
+
+    agree = all(
+        v["options"] == l["options"]
+        and abs(v["percent_correct"] - l["percent_correct"]) < 0.1
+        and abs(v["discrimination"] - l["discrimination"]) < 0.01
+        for v, l in zip(vectorized["items"], looped["items"])
+    )
+    print(json.dumps({
+        "players": args.players,
+        "questions": args.questions,
+        "vectorized_ms": round(vectorized_ms, 1),
+        "loop_ms": round(loop_ms, 1),
+        "speedup": round(loop_ms / vectorized_ms, 1),
+        "results_agree": agree,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=10000)
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    main(parser.parse_args())
@@ -0,0 +1,334 @@
+"""
+Load generator: ROOMS rooms x PLAYERS simulated players over the real HTTP and WebSocket
+endpoints, playing a full exam (start_game, answers, force_submit). Prints a JSON report.
+
+By default it starts its own server (uvicorn benchmarks.offline_server:app, i.e. main:app
+on an in-memory MongoDB), so it runs offline with no MongoDB or Redis. Point it at a running server with --url, and
+pass --server-pid to sample that server's CPU and RSS.
+
+    python -m benchmarks.loadgen --rooms 20 --players 25 --questions 10
+    python -m benchmarks.loadgen --protocol msgpack --out results.json
+    python -m benchmarks.loadgen --url http://localhost:8000 --server-pid 4242
+
+Latencies are measured from the moment the host's command is sent to the moment each
+player receives the resulting broadcast:
+  game_start       start_game -> game_start (full question set fan-out)
+  game_over        force_submit -> game_over (leaderboard fan-out)
+  answer_progress  submit_answer -> the participant_delta showing it; includes the
+                   ROSTER_FLUSH_INTERVAL_MS coalescing window by design
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - only needed for --protocol msgpack
+    msgpack = None
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - CPU/RSS sampling is skipped without it
+    psutil = None
+
+MSGPACK_SUBPROTOCOL = "quizpulse.msgpack.v1"
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_quiz(questions: int) -> dict:
+    return {
+        "title": "Load test",
+        "topic": "benchmark",
+        "organization_id": "loadgen",
+        "created_by": "loadgen",
+        "questions": [
+            {
+                "text": f"Question {i}: pick the right option",
+                "options": [{"text": f"Option {o}", "is_correct": o == i % 4} for o in range(4)],
+                "points": 100,
+                "time_limit": 30,
+            }
+            for i in range(questions)
+        ],
+    }
+
+
+def percentiles(samples: List[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return round(ordered[min(int(q * (len(ordered) - 1) + 0.5), len(ordered) - 1)] * 1000, 2)
+
+    return {"count": len(ordered), "p50": at(0.50), "p95": at(0.95), "p99": at(0.99), "max": at(1.0)}
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {"game_start": [], "game_over": [], "answer_progress": []}
+        self.connect_times: List[float] = []
+        self.sent = 0
+        self.received = 0
+        self.bytes_received = 0
+        self.errors = 0
+
+
+class Player:
+    def __init__(self, base_ws: str, room_code: str, player_id: str, stats: Stats, args):
+        self.url = f"{base_ws}/ws/{room_code}/{player_id}"
+        self.player_id = player_id
+        self.stats = stats
+        self.args = args
+        self.binary = args.protocol == "msgpack"
+        self.ws = None
+        self.arrivals: Dict[str, asyncio.Future] = {}
+        # submit time of each answer still waiting to show up in a roster delta
+        self.pending_answers: List[float] = []
+        self._reader: Optional[asyncio.Task] = None
+
+    def _arrival(self, msg_type: str) -> asyncio.Future:
+        if msg_type not in self.arrivals:
+            self.arrivals[msg_type] = asyncio.get_running_loop().create_future()
+        return self.arrivals[msg_type]
+
+    async def connect(self, gate: asyncio.Semaphore):
+        async with gate:
+            started = time.perf_counter()
+            self.ws = await websockets.connect(
+                self.url,
+                subprotocols=[MSGPACK_SUBPROTOCOL] if self.binary else None,
+                compression="deflate" if self.args.deflate else None,
+                max_size=None,
+                open_timeout=self.args.timeout,
+            )
+            self._reader = asyncio.create_task(self._read())
+            await asyncio.wait_for(self._arrival("state_sync"), self.args.timeout)
+            self.stats.connect_times.append(time.perf_counter() - started)
+
+    async def send(self, message: dict):
+        await self.ws.send(msgpack.packb(message) if self.binary else json.dumps(message))
+        self.stats.sent += 1
+
+    async def _read(self):
+        try:
+            async for frame in self.ws:
+                now = time.perf_counter()
+                self.stats.received += 1
+                self.stats.bytes_received += len(frame)
+                message = msgpack.unpackb(frame) if self.binary else json.loads(frame)
+                msg_type = message.get("type")
+                if msg_type == "participant_delta" and self.pending_answers:
+                    self._on_delta(message["payload"], now)
+                future = self._arrival(msg_type)
+                if not future.done():
+                    future.set_result(now)
+        except websockets.ConnectionClosed:
+            pass
+
+    def _on_delta(self, payload: dict, now: float):
+        for entry in payload.get("changed", ()):
+            if entry["id"] == self.player_id:
+                # Every answer up to the reported count has now been seen by the room
+                answered = entry["answered"]
+                while self.pending_answers and answered > 0:
+                    self.stats.latencies["answer_progress"].append(now - self.pending_answers.pop(0))
+                    answered -= 1
+
+    async def wait_for(self, msg_type: str, sent_at: float):
+        arrived = await asyncio.wait_for(self._arrival(msg_type), self.args.timeout)
+        self.stats.latencies[msg_type].append(arrived - sent_at)
+
+    async def answer_all(self):
+        for q in range(self.args.questions):
+            await asyncio.sleep(random.uniform(0, 2 * self.args.think_ms / 1000))
+            self.pending_answers.append(time.perf_counter())
+            await self.send({"type": "submit_answer", "payload": {"questionId": str(q), "optionIdx": random.randrange(4)}})
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+
+async def run_room(client: httpx.AsyncClient, base_ws: str, quiz_id: str, stats: Stats, gate, args):
+    response = await client.post("/api/create-room", json={"quiz_id": quiz_id})
+    response.raise_for_status()
+    room_code = response.json()["room_code"]
+    players = [Player(base_ws, room_code, f"player-{n}", stats, args) for n in range(args.players)]
+    try:
+        await asyncio.gather(*(p.connect(gate) for p in players))
+        host = players[0]
+
+        sent_at = time.perf_counter()
+        await host.send({"type": "start_game"})
+        await asyncio.gather(*(p.wait_for("game_start", sent_at) for p in players))
+
+        await asyncio.gather(*(p.answer_all() for p in players))
+        # Let the last roster flush land before ending the exam
+        await asyncio.sleep(0.5)
+
+        sent_at = time.perf_counter()
+        await host.send({"type": "force_submit"})
+        await asyncio.gather(*(p.wait_for("game_over", sent_at) for p in players))
+    except Exception as e:
+        stats.errors += 1
+        print(f"Room {room_code} failed: {e!r}", file=sys.stderr)
+    finally:
+        await asyncio.gather(*(p.close() for p in players), return_exceptions=True)
+
+
+class ResourceSampler:
+    """Samples CPU time and RSS of a process (the server) while the load runs."""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.25):
+        self.process = psutil.Process(pid) if psutil and pid else None
+        self.interval = interval
+        self.rss_peak = 0
+        self._cpu_start = None
+        self._task = None
+
+    def _cpu(self) -> float:
+        times = self.process.cpu_times()
+        return times.user + times.system
+
+    def start(self):
+        if self.process:
+            self._cpu_start = self._cpu()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            self.rss_peak = max(self.rss_peak, self.process.memory_info().rss)
+            await asyncio.sleep(self.interval)
+
+    def stop(self, wall_seconds: float) -> dict:
+        if not self.process:
+            return {}
+        self._task.cancel()
+        cpu_seconds = self._cpu() - self._cpu_start
+        rss = self.process.memory_info().rss
+        return {
+            "cpu_seconds": round(cpu_seconds, 2),
+            "cpu_percent": round(100 * cpu_seconds / wall_seconds, 1),
+            "rss_mb": round(rss / 2**20, 1),
+            "rss_peak_mb": round(max(self.rss_peak, rss) / 2**20, 1),
+        }
+
+
+def start_server(port: int) -> subprocess.Popen:
+    env = {**os.environ, "ROOM_STATE_BACKEND": "memory"}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.offline_server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+        # Keep our stdout pure JSON; server errors still go to stderr
+        stdout=subprocess.DEVNULL,
+    )
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("server did not become ready")
+        await asyncio.sleep(0.1)
+
+
+async def main(args) -> dict:
+    server = None
+    server_pid = args.server_pid
+    base_url = args.url
+    if base_url is None:
+        server = start_server(args.port)
+        server_pid = server.pid
+        base_url = f"http://127.0.0.1:{args.port}"
+    base_ws = base_url.replace("http", "ws", 1)
+
+    stats = Stats()
+    gate = asyncio.Semaphore(args.connect_concurrency)
+    try:
+        limits = httpx.Limits(max_connections=args.connect_concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            await wait_until_ready(client, args.timeout)
+            response = await client.post("/api/quizzes/", json=make_quiz(args.questions))
+            response.raise_for_status()
+            quiz_id = response.json()["_id"]
+
+            sampler = ResourceSampler(server_pid)
+            own_cpu = time.process_time()
+            started = time.perf_counter()
+            sampler.start()
+            await asyncio.gather(*(run_room(client, base_ws, quiz_id, stats, gate, args) for _ in range(args.rooms)))
+            wall = time.perf_counter() - started
+            server_usage = sampler.stop(wall)
+            own_cpu = time.process_time() - own_cpu
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    return {
+        "config": {
+            "rooms": args.rooms,
+            "players_per_room": args.players,
+            "questions": args.questions,
+            "think_ms": args.think_ms,
+            "protocol": args.protocol,
+            "deflate": args.deflate,
+            "server": "spawned (mongomock)" if server is not None else base_url,
+        },
+        "duration_seconds": round(wall, 2),
+        "connect_ms": percentiles(stats.connect_times),
+        "latency_ms": {name: percentiles(samples) for name, samples in stats.latencies.items()},
+        "messages": {
+            "sent": stats.sent,
+            "received": stats.received,
+            "received_per_second": round(stats.received / wall, 1),
+            "bytes_received": stats.bytes_received,
+        },
+        "server": server_usage,
+        # If this approaches one core, the generator (not the server) is the bottleneck
+        "loadgen_cpu_seconds": round(own_cpu, 2),
+        "errors": stats.errors,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--players", type=int, default=25, help="players per room; the first one hosts")
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--think-ms", type=float, default=100.0, help="mean delay before each answer")
+    parser.add_argument("--protocol", choices=("json", "msgpack"), default="json")
+    parser.add_argument("--no-deflate", dest="deflate", action="store_false", help="don't offer permessage-deflate")
+    parser.add_argument("--url", help="target a running server instead of spawning one")
+    parser.add_argument("--server-pid", type=int, help="PID of the --url server, for CPU/RSS sampling")
+    parser.add_argument("--port", type=int, default=8099, help="port for the spawned server")
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    arguments = parser.parse_args()
+    if arguments.protocol == "msgpack" and msgpack is None:
+        parser.error("--protocol msgpack needs the msgpack package")
+
+    report = asyncio.run(main(arguments))
+    output = json.dumps(report, indent=2)
+    print(output)
+    if arguments.out:
+        with open(arguments.out, "w") as f:
+            f.write(output + "\n")
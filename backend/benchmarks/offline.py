@@ -0,0 +1,43 @@
+"""
+In-memory stand-in for MongoDB (mongomock-motor), for benchmarks, demos and tests
+that run without a server. Nothing in `app` knows about it:
+
+    uvicorn benchmarks.offline_server:app   # main:app with Mongo swapped for mongomock
+
+and in-process, `use_mongomock()` before the first `connect_to_mongo()`.
+"""
+from app.core.config import settings
+from app.db import mongodb
+
+
+def accept_bulk_sort_kwarg():
+    # pymongo >= 4.11 passes `sort` to bulk replace/update builders; mongomock doesn't
+    # accept it yet. We never sort bulk writes, so drop it.
+    from mongomock.collection import BulkOperationBuilder
+
+    for name in ("add_replace", "add_update"):
+        original = getattr(BulkOperationBuilder, name)
+        if getattr(original, "accepts_sort", False):
+            continue
+
+        def patched(self, *args, _original=original, sort=None, **kwargs):
+            return _original(self, *args, **kwargs)
+
+        patched.accepts_sort = True
+        setattr(BulkOperationBuilder, name, patched)
+
+
+def use_mongomock():
+    """Make `connect_to_mongo` connect to a fresh in-memory database."""
+    from mongomock_motor import AsyncMongoMockClient
+
+    accept_bulk_sort_kwarg()
+
+    async def connect_to_mongo():
+        mongodb.db.client = AsyncMongoMockClient()
+        print("Using in-memory MongoDB (mongomock)")
+
+    mongodb.connect_to_mongo = connect_to_mongo
+    # There is no pool to warm
+    settings.MONGODB_MIN_POOL_SIZE = 0
+
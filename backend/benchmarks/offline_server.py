@@ -0,0 +1,11 @@
+"""
+main:app against an in-memory MongoDB, for benchmarks and demos without a server:
+
+    uvicorn benchmarks.offline_server:app
+"""
+from benchmarks.offline import use_mongomock
+
+# Before main is imported, so its `from app.db.mongodb import connect_to_mongo` gets the stand-in
+use_mongomock()
+
+from main import app  # noqa: E402,F401
@@ -0,0 +1,164 @@
+"""
+Crash-recovery benchmark: how long does a restarted worker take to rebuild its rooms?
+
+Fills the room event log with ROOMS rooms of PLAYERS players who each answered every
+question, flushes it, then times `manager.recover_rooms()` in a fresh manager and checks
+that every participant's answers survived. Prints a JSON report.
+
+    python -m benchmarks.recovery --rooms 1000 --players 20 --questions 10
+    python -m benchmarks.recovery --mongo-url mongodb://localhost:27017   # real Mongo
+
+By default it runs against mongomock-motor (see benchmarks.offline), which is orders
+of magnitude slower than a real server at reading documents back, so `load_ms` there is
+a loose upper bound; `replay_ms` (applying snapshots and events to rooms) is the same
+either way.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from app.core.config import settings
+from app.db import mongodb
+from app.services import websocket_manager
+from app.services.event_log import event_log
+from benchmarks.offline import use_mongomock
+
+
+def make_quiz(questions: int) -> dict:
+    return {
+        "_id": "bench-quiz",
+        "title": "Recovery benchmark",
+        "updated_at": None,
+        "questions": [
+            {
+                "text": f"Question {i}",
+                "options": [{"text": str(o), "is_correct": o == i % 4} for o in range(4)],
+                "points": 100,
+                "time_limit": 30,
+            }
+            for i in range(questions)
+        ],
+    }
+
+
+class _IdleSocket:
+    """Just enough of a WebSocket for ConnectionManager.connect; frames are discarded."""
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, text: str):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def populate(manager, rooms: int, players: int, questions: int) -> dict:
+    quiz = make_quiz(questions)
+    expected = {}
+    for r in range(rooms):
+        room_code = f"{r:06d}"
+        await manager.create_room(room_code, quiz)
+        for p in range(players):
+            await manager.connect(room_code, f"p{p}", _IdleSocket())
+        await manager.handle_command(room_code, "p0", {"type": "start_game"})
+        for p in range(players):
+            for q in range(questions):
+                await manager.handle_command(
+                    room_code, f"p{p}",
+                    {"type": "submit_answer", "payload": {"questionId": str(q), "optionIdx": random.randrange(4)}},
+                )
+        for p in range(players):
+            manager.disconnect(room_code, f"p{p}")
+        # Stand in for the periodic group commit, which never gets a turn in this tight loop
+        await event_log.flush()
+        expected[room_code] = {
+            pid: (p.score, p.answers_dict()) for pid, p in manager.room_states[room_code].participants.items()
+        }
+    return expected
+
+
+async def main(args):
+    if args.mongo_url:
+        settings.MONGODB_URL = args.mongo_url
+    else:
+        use_mongomock()
+    settings.DATABASE_NAME = args.database
+    await mongodb.connect_to_mongo()
+    database = await mongodb.get_database()
+    await database["room_events"].delete_many({})
+    await database["room_snapshots"].delete_many({})
+    settings.ROOM_SNAPSHOT_EVERY_EVENTS = args.snapshot_every
+    settings.ROOM_SNAPSHOT_MIN_INTERVAL_SECONDS = args.snapshot_min_interval
+
+    await event_log.start()
+    started = time.perf_counter()
+    expected = await populate(websocket_manager.manager, args.rooms, args.players, args.questions)
+    await event_log.stop()
+    populate_s = time.perf_counter() - started
+    database = await mongodb.get_database()
+    events_stored = await database["room_events"].count_documents({})
+    snapshots_stored = await database["room_snapshots"].count_documents({})
+
+    # "Restart": a brand-new manager with nothing in memory
+    fresh = websocket_manager.ConnectionManager()
+    load = event_log.load
+    timings = {}
+
+    async def timed_load():
+        load_started = time.perf_counter()
+        records = await load()
+        timings["load_ms"] = (time.perf_counter() - load_started) * 1000
+        return records
+
+    event_log.load = timed_load
+    started = time.perf_counter()
+    recovered = await fresh.recover_rooms()
+    recovery_ms = (time.perf_counter() - started) * 1000
+
+    recovered_participants = {
+        (room_code, pid): (p.score, p.answers_dict())
+        for room_code, room in fresh.room_states.items()
+        for pid, p in room.participants.items()
+    }
+    mismatches = sum(
+        1
+        for room_code, participants in expected.items()
+        for pid, result in participants.items()
+        if recovered_participants.get((room_code, pid)) != result
+    )
+
+    print(json.dumps({
+        "mongodb_url": args.mongo_url or "in-memory",
+        "rooms": args.rooms,
+        "players_per_room": args.players,
+        "questions": args.questions,
+        "snapshot_every_events": args.snapshot_every,
+        "snapshot_min_interval_seconds": args.snapshot_min_interval,
+        "events_appended": event_log.stats["events_appended"],
+        "events_stored": events_stored,
+        "snapshots_stored": snapshots_stored,
+        "populate_seconds": round(populate_s, 2),
+        "rooms_recovered": recovered,
+        "recovery_ms": round(recovery_ms, 1),
+        "load_ms": round(timings["load_ms"], 1),
+        "replay_ms": round(recovery_ms - timings["load_ms"], 1),
+        "recovery_ms_per_room": round(recovery_ms / max(recovered, 1), 3),
+        "participant_mismatches": mismatches,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--snapshot-every", type=int, default=settings.ROOM_SNAPSHOT_EVERY_EVENTS)
+    # The populate loop replays a whole exam in seconds; keep snapshots in the picture
+    parser.add_argument("--snapshot-min-interval", type=float, default=0.0)
+    parser.add_argument("--mongo-url", help="e.g. mongodb://localhost:27017 for a real server (default: in-memory)")
+    parser.add_argument("--database", default="quizpulse_recovery_bench")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,87 @@
+"""
+Room memory benchmark: bytes per participant and per room, dict layout vs compact layout.
+
+Builds the same room twice: once in the original plain-dict layout (raw quiz document,
+duplicate `questions` list, [correct, points] answer key, participant dicts with a
+{"questionId": optionIdx} answers map) and once as the slotted Room/Participant model,
+with every participant having answered every question. Sizes come from a recursive
+getsizeof, so shared strings and ints are counted once. Prints a JSON report.
+
+    python -m benchmarks.room_memory --players 200 --questions 50
+"""
+import argparse
+import json
+import random
+
+from app.services.room_reaper import deep_sizeof
+from app.services.room_state import Room, compile_quiz
+
+
+def make_quiz(questions: int) -> dict:
+    return {
+        "_id": "bench-quiz",
+        "title": "Memory benchmark",
+        "updated_at": None,
+        "questions": [
+            {
+                "text": f"Question {i}: which of these is right?",
+                "options": [{"text": f"Option {o}", "is_correct": o == i % 4} for o in range(4)],
+                "points": 100,
+                "time_limit": 30,
+            }
+            for i in range(questions)
+        ],
+    }
+
+
+def dict_room(quiz: dict, compact: Room) -> dict:
+    # The layout rooms had before the compact model, filled with the same answers
+    return {
+        "status": "active",
+        "mode": "exam",
+        "current_question": -1,
+        "quiz_data": quiz,
+        "questions": quiz["questions"],
+        "answer_key": [
+            [next((i for i, o in enumerate(q["options"]) if o["is_correct"]), -1), q["points"]]
+            for q in quiz["questions"]
+        ],
+        "participants": {pid: p.to_dict() for pid, p in compact.participants.items()},
+        "roster_seq": 0,
+        "leaderboard": [],
+    }
+
+
+def main(args):
+    quiz = make_quiz(args.questions)
+    room = Room(quiz=compile_quiz(quiz), status="active")
+    for n in range(args.players):
+        p = room.add_participant(f"student-{n:05d}")
+        for q in range(args.questions):
+            p.set_answer(q, random.randrange(4))
+    legacy = dict_room(quiz, room)
+
+    legacy_participants = deep_sizeof(legacy["participants"])
+    compact_participants = deep_sizeof(room.participants)
+    legacy_room = deep_sizeof({k: v for k, v in legacy.items() if k not in ("quiz_data", "questions")})
+    compact_room = deep_sizeof(room) - deep_sizeof(room.quiz)
+
+    print(json.dumps({
+        "players": args.players,
+        "questions": args.questions,
+        "bytes_per_participant": {
+            "dict": round(legacy_participants / args.players),
+            "compact": round(compact_participants / args.players),
+        },
+        # Per room, excluding the quiz itself (shared between rooms in both layouts)
+        "bytes_per_room": {"dict": legacy_room, "compact": compact_room},
+        "quiz_bytes": {"raw_document": deep_sizeof(quiz), "compiled": deep_sizeof(room.quiz)},
+        "participant_reduction": round(1 - compact_participants / legacy_participants, 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,150 @@
+"""
+Cold start benchmark: how long a fresh worker takes from process spawn to serving, and
+where its import time goes.
+
+Each run spawns `uvicorn main:app` and measures, from the moment the process is spawned:
+  ready_ms     first 200 from GET / (startup hooks done, socket listening)
+  first_ws_ms  first WebSocket accepted and answered with state_sync, after creating a
+               quiz and a room over HTTP, i.e. what a player hitting a new worker sees
+
+The import breakdown comes from `python -X importtime -c "import main"`: total import
+time of main, self time summed per top-level package, and whether the modules the app
+defers until first use (DEFERRED_MODULES) were imported anyway.
+
+Runs offline by default (benchmarks.offline_server: main:app on an in-memory MongoDB,
+which has no connections to set up). Pass --mongodb-url and
+--redis-url (with ROOM_STATE_BACKEND=redis in the environment if wanted) to include real
+connection setup and pool warm-up.
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --mongodb-url mongodb://localhost:27017 --redis-url redis://localhost:6379
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+import websockets
+
+from benchmarks.loadgen import BACKEND_DIR, make_quiz
+
+# Imported on first use rather than at startup (numpy and analytics by the analytics
+# handler, certifi by connect_to_mongo); a regression shows up as True here
+DEFERRED_MODULES = ("numpy", "app.services.analytics", "certifi")
+
+
+def server_env(args) -> dict:
+    env = dict(os.environ)
+    if args.mongodb_url:
+        env["MONGODB_URL"] = args.mongodb_url
+    if args.redis_url:
+        env["REDIS_URL"] = args.redis_url
+    return env
+
+
+def server_app(args) -> str:
+    return "main:app" if args.mongodb_url else "benchmarks.offline_server:app"
+
+
+def import_breakdown(args) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=server_env(args), capture_output=True, text=True, check=True,
+    )
+    # "import time: <self us> | <cumulative us> | <indented module name>", children
+    # before their parent. Only main's own subtree counts: whatever site-packages hooks
+    # import at interpreter start is not ours.
+    subtree, total_us = [], 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        subtree.append((name.strip(), int(self_us)))
+        if name[1:2] != " ":  # a top-level import closes its subtree
+            if name.strip() == "main":
+                total_us = int(cumulative_us)
+                break
+            subtree = []
+    by_package, imported = defaultdict(int), set()
+    for name, self_us in subtree:
+        imported.add(name)
+        by_package[name.split(".")[0]] += self_us
+    top = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]
+    return {
+        "import_main_ms": round(total_us / 1000, 1),
+        "self_ms_by_package": {package: round(us / 1000, 1) for package, us in top},
+        "deferred_imported": {module: module in imported for module in DEFERRED_MODULES},
+    }
+
+
+async def cold_start(args, port: int) -> dict:
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", server_app(args), "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=server_env(args), stdout=subprocess.DEVNULL,
+    )
+    try:
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            deadline = started + args.timeout
+            while True:
+                try:
+                    if (await client.get("/")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.perf_counter() > deadline:
+                    raise RuntimeError("server did not become ready")
+                await asyncio.sleep(0.005)
+            ready_ms = (time.perf_counter() - started) * 1000
+
+            quiz_id = (await client.post("/api/quizzes/", json=make_quiz(5))).json()["_id"]
+            room_code = (await client.post("/api/create-room", json={"quiz_id": quiz_id})).json()["room_code"]
+        async with websockets.connect(f"ws://127.0.0.1:{port}/ws/{room_code}/host") as ws:
+            await asyncio.wait_for(ws.recv(), args.timeout)
+        first_ws_ms = (time.perf_counter() - started) * 1000
+    finally:
+        server.terminate()
+        server.wait()
+    return {"ready_ms": ready_ms, "first_ws_ms": first_ws_ms}
+
+
+def summarize(samples: list) -> dict:
+    return {"median": round(statistics.median(samples), 1), "min": round(min(samples), 1)}
+
+
+async def main(args) -> dict:
+    runs = []
+    for n in range(args.runs):
+        # A fresh port per run so a lingering socket from the last one can't interfere
+        runs.append(await cold_start(args, args.port + n))
+    return {
+        "runs": args.runs,
+        "mongodb_url": args.mongodb_url or "in-memory",
+        "ready_ms": summarize([run["ready_ms"] for run in runs]),
+        "first_ws_ms": summarize([run["first_ws_ms"] for run in runs]),
+        **import_breakdown(args),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8150, help="first port; run n uses port + n")
+    parser.add_argument("--mongodb-url", help="a real server (default: in-memory)")
+    parser.add_argument("--redis-url", help="defaults to the server's own REDIS_URL setting")
+    parser.add_argument("--top", type=int, default=12, help="packages listed in the import breakdown")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    args = parser.parse_args()
+    report = asyncio.run(main(args))
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
@@ -1,17 +1,32 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from fastapi.middleware.cors import CORSMiddleware
 
-import json
+import asyncio
+import time
 from app.core.config import settings
-from app.db.mongodb import connect_to_mongo, close_mongo_connection
-from app.db.redis import connect_to_redis, close_redis_connection
+from app.db.mongodb import connect_to_mongo, close_mongo_connection, prepare_mongo
+from app.db.redis import connect_to_redis, close_redis_connection, redis_client, warm_redis_pool
 from app.services.websocket_manager import manager
+from app.services.encoding import MSGPACK_SUBPROTOCOL, negotiate_subprotocol
+from app.services.inbound_guard import inbound_guard
+from app.services.sharding import SHARD_REDIRECT_CLOSE_CODE, shard_router
+from app.services.room_store import create_room_store
+from app.services.session_writer import session_writer
+from app.services.event_log import event_log
+from app.services.room_reaper import room_reaper
+from app.services.metrics import register_runtime_collector
 
-from app.api.endpoints import quizzes
+from app.services.quiz_cache import quiz_cache
+
+from app.api.endpoints import analytics, quizzes
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
 app.include_router(quizzes.router, tags=["Quizzes"], prefix="/api/quizzes")
+app.include_router(analytics.router, tags=["Analytics"], prefix="/api/analytics")
+
+register_runtime_collector(manager, room_reaper, session_writer, event_log, quiz_cache, inbound_guard)
 
 # Set all CORS enabled origins
 if settings.BACKEND_CORS_ORIGINS:
@@ -23,18 +38,63 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+# Index builds and pool warm-up: started by startup, never waited on
+background_tasks = set()
+
+def run_in_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
 @app.on_event("startup")
 async def startup_event():
+    started = time.perf_counter()
+    await room_reaper.start()
     try:
         await connect_to_mongo()
-        await connect_to_redis()
     except Exception as e:
         print(f"Startup Warning: Could not connect to Database: {e}")
-        # We don't raise here so the server still starts. 
-        # API endpoints using DB will fail, but static/healthcheck will work.
+    # Started whatever Mongo's state: a failed write is kept and retried with back-off
+    await session_writer.start()
+    # Recovery and Redis come up concurrently, and one failing doesn't hold back the other
+    results = await asyncio.gather(recover_rooms(), start_redis(), return_exceptions=True)
+    for name, result in zip(("recover rooms", "connect to Redis"), results):
+        if isinstance(result, Exception):
+            print(f"Startup Warning: Could not {name}: {result}")
+            # We don't raise here so the server still starts.
+            # API endpoints using DB will fail, but static/healthcheck will work.
+    run_in_background(prepare_mongo())
+    run_in_background(warm_redis_pool())
+    print(f"Startup complete in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+async def recover_rooms():
+    # With Redis rooms already outlive a worker; the event log covers in-memory rooms
+    if not (settings.ROOM_EVENT_LOG_ENABLED and settings.ROOM_STATE_BACKEND == "memory"):
+        return
+    try:
+        started = time.perf_counter()
+        # Bounded: with Mongo unreachable this would otherwise wait out server selection
+        recovered = await asyncio.wait_for(manager.recover_rooms(), settings.ROOM_RECOVERY_TIMEOUT_SECONDS)
+        print(f"Recovered {recovered} rooms in {(time.perf_counter() - started) * 1000:.0f} ms")
+    except asyncio.TimeoutError:
+        print(f"Startup Warning: Room recovery timed out after {settings.ROOM_RECOVERY_TIMEOUT_SECONDS:g} s")
+    finally:
+        # New events are logged even if the old ones could not be replayed
+        await event_log.start()
+
+async def start_redis():
+    await connect_to_redis()
+    if settings.ROOM_STATE_BACKEND != "memory":
+        await manager.use_store(create_room_store(settings.ROOM_STATE_BACKEND, redis_client.client))
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    for task in list(background_tasks):
+        task.cancel()
+    await room_reaper.stop()
+    await manager.store.stop()
+    await event_log.stop()
+    await session_writer.stop()
     await close_mongo_connection()
     await close_redis_connection()
 
@@ -42,51 +102,49 @@ async def shutdown_event():
 async def root():
     return {"message": "Welcome to QuizPulse API"}
 
-from app.db.mongodb import get_database
-from bson import ObjectId
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text format; per-worker (scrape each uvicorn worker separately)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/api/stats/rooms")
+async def room_stats():
+    # Gauges as of the reaper's last sweep, plus its eviction counters
+    return room_reaper.snapshot()
+
+@app.get("/api/stats/shard")
+async def shard_stats():
+    # Live load of this worker; run_shards.py polls every shard and turns cpu_seconds into %
+    return {
+        "shard": shard_router.index,
+        "shards": shard_router.count,
+        "rooms": len(manager.room_states),
+        "sockets": sum(len(sockets) for sockets in manager.active_connections.values()),
+        "cpu_seconds": time.process_time(),
+    }
+
+from app.services.quiz_cache import fetch_quiz
 
-import random
-import string
 from pydantic import BaseModel
+from typing import Literal
 
 class CreateRoomRequest(BaseModel):
     quiz_id: str
+    mode: Literal["exam", "live"] = "exam"
 
 @app.post("/api/create-room")
 async def create_room_endpoint(request: CreateRoomRequest):
-    room_code = ''.join(random.choices(string.digits, k=6))
-    
-    # Ensure uniqueness (simple check)
-    while room_code in manager.active_connections:
-        room_code = ''.join(random.choices(string.digits, k=6))
-
     try:
-        db = await get_database()
-        quiz = None
-        
-        # Try finding by ObjectId
-        if ObjectId.is_valid(request.quiz_id):
-            quiz = await db["quizzes"].find_one({"_id": ObjectId(request.quiz_id)})
-        
-        # Fallback to String ID if not found
-        if not quiz:
-             quiz = await db["quizzes"].find_one({"_id": request.quiz_id})
+        # Cached: a burst of rooms for the same quiz costs one Mongo lookup
+        quiz = await fetch_quiz(request.quiz_id)
 
         if quiz:
+             # A free code owned by this worker's shard (any code when not sharded)
+             room_code = await manager.allocate_room_code()
              # Initialize room with quiz questions
-             # Note: We are setting state in the Single Manager Instance
-             manager.room_states[room_code] = {
-                 "status": "lobby",
-                 "current_question": -1,
-                 "quiz_data": quiz, # Store full quiz to allow extracting questions
-                 "questions": quiz.get("questions", []), 
-                 "participants": [],
-                 "leaderboard": []
-             }
-             # Pre-populate active_connections dict so connection logic knows room exists
-             manager.active_connections[room_code] = {}
+             await manager.create_room(room_code, quiz, request.mode)
              
-             return {"room_code": room_code}
+             return {"room_code": room_code, "ws_url": shard_router.url_for(room_code)}
         else:
             raise HTTPException(status_code=404, detail="Quiz not found")
 
@@ -98,27 +156,61 @@ async def create_room_endpoint(request: CreateRoomRequest):
 
 @app.websocket("/ws/{room_code}/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, room_code: str, client_id: str):
+    if not shard_router.owns(room_code):
+        # Another shard holds this room; tell the client where (it reconnects there)
+        await websocket.accept()
+        await websocket.close(code=SHARD_REDIRECT_CLOSE_CODE, reason=shard_router.url_for(room_code) or "")
+        return
+
     # Only allow connection if room has been initialized via API
     # (Or if it's already active)
     
     # Note: manager.connect will handle the actual acceptance and tracking
-    if room_code not in manager.room_states and room_code not in manager.active_connections:
+    if not await manager.room_exists(room_code):
          # Room doesn't exist. Reject.
          await websocket.close(code=4000) # Custom code for "Room Not Found"
          return
 
-    await manager.connect(room_code, client_id, websocket)
+    # JSON text unless the client offered the MessagePack sub-protocol
+    subprotocol = negotiate_subprotocol(websocket.scope.get("subprotocols", []))
+    binary = subprotocol == MSGPACK_SUBPROTOCOL
+    # Reconnect storms are admitted at a steady rate rather than all at once
+    await inbound_guard.pace_connection()
+    await manager.connect(room_code, client_id, websocket, subprotocol, resume_request(websocket))
+    bucket = inbound_guard.client_bucket()
     try:
         while True:
-            # Expecting JSON commands
-            data_str = await websocket.receive_text()
-            try:
-                data = json.loads(data_str)
-                await manager.handle_command(room_code, client_id, data)
-            except json.JSONDecodeError:
-                pass
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            received_at = time.time()
+            # Expecting JSON (or MessagePack) commands; a frame of the other kind is None
+            raw = message.get("bytes") if binary else message.get("text")
+            # Oversized, rate-limited, malformed or unknown commands stop here; the
+            # client is told, so it can retry what was only rate-limited
+            data, rejection = inbound_guard.admit(room_code, bucket, raw, binary)
+            if rejection is not None:
+                await manager.reject(room_code, client_id, rejection, raw)
+                continue
+            await manager.handle_command(room_code, client_id, data, received_at)
     except WebSocketDisconnect:
-        manager.disconnect(room_code, client_id)
-        await manager.broadcast(room_code, {"type": "disconnect", "user": client_id})
+        pass
+    finally:
+        # However the loop ended; the leave is announced in the next coalesced roster delta
+        manager.disconnect(room_code, client_id, websocket)
+        if room_code not in manager.active_connections:
+            inbound_guard.forget_room(room_code)
+
+
+def resume_request(websocket: WebSocket):
+    # ?resume=<token>&roster_seq=<last applied seq>&questions=1 (client still has them)
+    params = websocket.query_params
+    if not params.get("resume"):
+        return None
+    try:
+        roster_seq = int(params.get("roster_seq", ""))
+    except ValueError:
+        roster_seq = None
+    return {"token": params["resume"], "roster_seq": roster_seq, "questions": params.get("questions") == "1"}
 
 
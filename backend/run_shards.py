@@ -0,0 +1,117 @@
+"""
+Run QuizPulse as several worker processes on one box, each owning a shard of rooms.
+
+Every worker serves two sockets:
+  - the shared front port (--port), bound once here and inherited, so the kernel spreads
+    incoming HTTP requests (and first WebSocket attempts) across all workers;
+  - its own shard port (--shard-base-port + index), which SHARD_URLS advertise.
+
+Each worker creates rooms with codes that hash to its own shard, so rooms spread as evenly
+as create-room requests do. A WebSocket that lands on the wrong worker is closed with code
+4001 and the owning shard's URL, and the client reconnects there.
+
+Every --report-interval seconds the launcher polls /api/stats/shard on each worker and
+prints one JSON line of per-shard load (rooms, sockets, CPU %).
+
+    python run_shards.py --workers 4 --port 8000 --shard-base-port 8001 --public-host quiz.example.com
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import urllib.request
+
+
+def bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve_shard(index: int, front: socket.socket, args, shard_urls: list):
+    # Settings are read at import, so the environment has to be in place first
+    os.environ["SHARD_COUNT"] = str(args.workers)
+    os.environ["SHARD_INDEX"] = str(index)
+    os.environ["SHARD_URLS"] = json.dumps(shard_urls)
+    import uvicorn
+
+    own = bind(args.host, args.shard_base_port + index)
+    config = uvicorn.Config("main:app", log_level=args.log_level, ws_per_message_deflate=not args.no_deflate)
+    uvicorn.Server(config).run(sockets=[front, own])
+
+
+def shard_load(port: int) -> dict:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/stats/shard", timeout=2) as response:
+        return json.load(response)
+
+
+def report(args, previous: dict, interval: float) -> dict:
+    loads, line = {}, []
+    for index in range(args.workers):
+        try:
+            load = shard_load(args.shard_base_port + index)
+        except OSError:
+            line.append({"shard": index, "up": False})
+            continue
+        loads[index] = load
+        cpu = None
+        if index in previous:
+            cpu = round(100 * (load["cpu_seconds"] - previous[index]["cpu_seconds"]) / interval, 1)
+        line.append({"shard": index, "rooms": load["rooms"], "sockets": load["sockets"], "cpu_percent": cpu})
+    print(json.dumps({"at": round(time.time(), 1), "shards": line}), flush=True)
+    return loads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--shard-base-port", type=int, default=8001)
+    parser.add_argument("--public-host", default="localhost", help="Host name clients use to reach the shard ports")
+    parser.add_argument("--public-scheme", default="ws", choices=("ws", "wss"))
+    parser.add_argument("--report-interval", type=float, default=10.0)
+    parser.add_argument("--log-level", default="warning")
+    parser.add_argument("--no-deflate", action="store_true", help="Disable permessage-deflate")
+    args = parser.parse_args()
+
+    shard_urls = [
+        f"{args.public_scheme}://{args.public_host}:{args.shard_base_port + i}" for i in range(args.workers)
+    ]
+    front = bind(args.host, args.port)
+    # fork: children inherit the bound front socket and must not have imported the app yet
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=serve_shard, args=(i, front, args, shard_urls), daemon=True)
+        for i in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    print(f"{args.workers} shards on :{args.port}, shard ports {args.shard_base_port}-{args.shard_base_port + args.workers - 1}")
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    previous = {}
+    try:
+        while all(worker.is_alive() for worker in workers):
+            time.sleep(args.report_interval)
+            previous = report(args, previous, args.report_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.core.config import settings
+from app.db import mongodb
+from benchmarks.offline import accept_bulk_sort_kwarg
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """A fresh in-memory MongoDB behind app.db.mongodb.get_database."""
+    accept_bulk_sort_kwarg()
+    monkeypatch.setattr(mongodb.db, "client", AsyncMongoMockClient())
+    return mongodb.db.client[settings.DATABASE_NAME]
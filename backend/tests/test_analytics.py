@@ -0,0 +1,76 @@
+"""
+Item analysis of archived sessions: graded against the answer key the session was
+played with, whatever has happened to the quiz since.
+"""
+import asyncio
+from datetime import datetime
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.api.endpoints import analytics as analytics_endpoint
+from app.services.analytics import answer_matrix, item_analysis
+from app.services.room_state import AnswerKey, Participant, Room, compile_quiz
+from app.services.session_writer import SessionWriter
+
+QUIZ = {
+    "_id": "quiz",
+    "questions": [
+        {"text": f"q{q}", "options": [{"text": "a"}, {"text": "b"}, {"text": "c", "is_correct": True}]}
+        for q in range(3)
+    ],
+}
+
+
+def finished_room() -> Room:
+    room = Room(quiz=compile_quiz(QUIZ), session_id="session", created_at=datetime(2026, 1, 1), status="leaderboard")
+    for n in range(4):
+        p = room.add_participant(f"player-{n}")
+        for q in range(3):
+            p.set_answer(q, (n + q) % 3)
+        room.set_score(p, n)
+    return room
+
+
+def test_archived_session_outlives_its_quiz(database):
+    # The quiz was never stored (as if deleted since): grading needs only the session
+    async def run():
+        writer = SessionWriter()
+        await writer.start(background=False)
+        room = finished_room()
+        writer.mark_session("123456", room, room.participants.values())
+        assert await writer.flush() is True
+
+        session = await database["game_sessions"].find_one({"_id": "session"})
+        assert session["answer_key"] == {"correct": [2, 2, 2], "option_counts": [3, 3, 3]}
+        report = await analytics_endpoint.room_analytics("123456")
+        assert report["participants"] == 4
+        assert [item["correct_option"] for item in report["items"]] == [2, 2, 2]
+        assert [sum(item["options"]) for item in report["items"]] == [4, 4, 4]
+
+    asyncio.run(run())
+
+
+def test_session_without_answer_key_is_not_graded(database):
+    async def run():
+        await database["game_sessions"].insert_one({
+            "_id": "unkeyed", "quiz_id": "quiz", "room_code": "654321",
+            "state": {"status": "leaderboard"}, "created_at": datetime(2026, 1, 1),
+        })
+        with pytest.raises(HTTPException) as error:
+            await analytics_endpoint.room_analytics("654321")
+        assert error.value.status_code == 409
+
+    asyncio.run(run())
+
+
+def test_out_of_range_answers_do_not_break_the_analysis():
+    key = AnswerKey.from_document({"correct": [1, 0], "option_counts": [2, 2]})
+    participants = [
+        Participant.from_dict({"id": "ada", "answers": {"0": 1, "1": 5}}, len(key)),
+        Participant.from_dict({"id": "bob", "answers": {"0": 1000, "1": 1, "7": 0}}, len(key)),
+    ]
+    report = item_analysis(answer_matrix(participants, len(key)), np.array([10, 0]), key)
+    assert [item["options"] for item in report["items"]] == [[0, 1], [0, 1]]
+    assert report["items"][1]["response_rate"] == 100.0
@@ -0,0 +1,51 @@
+"""
+Room event log snapshots: the packed format round-trips through BSON, and the snapshot
+interval grows with the room.
+"""
+import bson
+
+from app.core.config import settings
+from app.services.event_log import restore_snapshot, snapshot_document, snapshot_interval
+from app.services.room_state import Room, compile_quiz
+
+QUIZ = {
+    "_id": "quiz",
+    "questions": [
+        {"text": f"q{q}", "options": [{"text": "a"}, {"text": "b", "is_correct": True}, {"text": "c"}]}
+        for q in range(4)
+    ],
+}
+
+
+def make_room(players: int) -> Room:
+    room = Room(quiz=compile_quiz(QUIZ), session_id="session", status="active")
+    for n in range(players):
+        p = room.add_participant(f"player.{n}")
+        for q in range(n % 5):
+            p.set_answer(q, (n + q) % 3)
+        room.set_score(p, n * 7)
+        p.completed = n % 2 == 0
+    return room
+
+
+def state(room: Room) -> dict:
+    return {
+        pid: (p.nickname, p.score, p.answers.tolist(), p.answered, p.completed)
+        for pid, p in room.participants.items()
+    }
+
+
+def test_packed_snapshot_round_trips():
+    room = make_room(25)
+    doc = bson.decode(bson.encode(snapshot_document("session", "123456", 40, room)))
+
+    restored = Room(quiz=compile_quiz(QUIZ))
+    restore_snapshot(restored, doc)
+    assert restored.status == "active"
+    assert state(restored) == state(room)
+    assert restored.standings(5) == room.standings(5)
+
+
+def test_snapshot_interval_grows_with_the_room():
+    assert snapshot_interval(make_room(10)) == settings.ROOM_SNAPSHOT_EVERY_EVENTS
+    assert snapshot_interval(make_room(1000)) == 1000 * settings.ROOM_SNAPSHOT_EVENTS_PER_PARTICIPANT
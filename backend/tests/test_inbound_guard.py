@@ -0,0 +1,62 @@
+"""
+Inbound frame admission: frames are limited by their size in bytes, and every frame
+turned away says why, with a retry hint when it was only rate-limited.
+"""
+import asyncio
+import json
+
+from app.core.config import settings
+from app.services.inbound_guard import InboundGuard, Rejection, TokenBucket
+from app.services.websocket_manager import ConnectionManager
+
+ANSWER = '{"type":"submit_answer","payload":{"questionId":"0","optionIdx":1}}'
+
+
+def test_text_frames_are_limited_by_bytes(monkeypatch):
+    monkeypatch.setattr(settings, "WS_MAX_FRAME_BYTES", 100)
+    guard = InboundGuard()
+    # 40 characters, 120 bytes of UTF-8
+    frame = '{"type":"start_game","x":"' + "€" * 40 + '"}'
+    assert len(frame) < 100
+    message, rejection = guard.admit("room", guard.client_bucket(), frame, binary=False)
+    assert message is None and rejection == Rejection("oversize")
+    assert guard.stats["dropped_oversize"] == 1
+
+
+def test_rate_limited_frames_are_retryable(monkeypatch):
+    monkeypatch.setattr(settings, "WS_CLIENT_BURST", 1)
+    guard = InboundGuard()
+    bucket = guard.client_bucket()
+    assert guard.admit("room", bucket, ANSWER, binary=False)[0]["type"] == "submit_answer"
+    message, rejection = guard.admit("room", bucket, ANSWER, binary=False)
+    assert message is None and rejection.reason == "client_rate"
+    assert 0 < rejection.retry_after <= 1 / settings.WS_CLIENT_RATE_PER_SECOND
+    # Garbage is rejected for good
+    assert guard.admit("room", TokenBucket(1, 1), "{", binary=False)[1] == Rejection("malformed")
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+
+def test_rejections_are_sent_to_the_client():
+    async def run():
+        manager = ConnectionManager()
+        websocket = FakeWebSocket()
+        await manager.connect("123456", "ada", websocket)
+        await manager.reject("123456", "ada", Rejection("room_rate", 0.25), ANSWER)
+        await manager.reject("123456", "ada", Rejection("invalid"), '{"type":"nope"}')
+        await asyncio.sleep(0.01)
+        return [m["payload"] for m in websocket.sent if m["type"] == "rejected"]
+
+    assert asyncio.run(run()) == [
+        {"reason": "room_rate", "retry_after": 0.25, "frame": ANSWER},
+        {"reason": "invalid"},
+    ]
@@ -0,0 +1,67 @@
+"""
+Live leaderboard: competition ranks with ties, top-N, and agreement with a full sort
+after any sequence of score changes.
+"""
+import random
+
+from app.services.leaderboard import Leaderboard
+
+
+def reference_rank(scores: dict, player_id: str) -> int:
+    # Competition rank: one more than the number of strictly higher scores
+    return 1 + sum(1 for score in scores.values() if score > scores[player_id])
+
+
+def test_tied_players_share_the_better_rank():
+    board = Leaderboard()
+    for player_id, score in [("ada", 300), ("bob", 200), ("cy", 200), ("dee", 100)]:
+        board.update(player_id, score)
+
+    assert [board.rank(p) for p in ("ada", "bob", "cy", "dee")] == [1, 2, 2, 4]
+    assert board.top(10) == [(1, "ada", 300), (2, "bob", 200), (2, "cy", 200), (4, "dee", 100)]
+    assert board.rank("nobody") is None
+
+
+def test_top_n_is_a_prefix():
+    board = Leaderboard()
+    for n in range(50):
+        board.update(f"p{n:02}", n % 7)
+    full = board.top(50)
+    assert board.top(5) == full[:5]
+    assert board.top(0) == []
+    assert len(board.top(100)) == 50
+
+
+def test_score_changes_and_removals_move_players():
+    board = Leaderboard()
+    board.update("ada", 100)
+    board.update("bob", 200)
+    assert board.rank("ada") == 2
+    board.update("ada", 300)
+    assert board.rank("ada") == 1 and board.rank("bob") == 2
+    # Same score again is a no-op
+    board.update("ada", 300)
+    assert len(board) == 2
+    board.discard("ada")
+    board.discard("ada")
+    assert len(board) == 1 and board.rank("bob") == 1 and board.rank("ada") is None
+
+
+def test_matches_a_full_sort_after_random_updates():
+    rng = random.Random(7)
+    board, scores = Leaderboard(), {}
+    for _ in range(2000):
+        player_id = f"p{rng.randrange(60)}"
+        if rng.random() < 0.05:
+            board.discard(player_id)
+            scores.pop(player_id, None)
+        else:
+            scores[player_id] = rng.randrange(0, 1000, 50)
+            board.update(player_id, scores[player_id])
+
+    assert len(board) == len(scores)
+    for player_id in scores:
+        assert board.rank(player_id) == reference_rank(scores, player_id)
+    expected = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    assert [(pid, score) for _, pid, score in board.top(len(scores))] == expected
+    assert all(rank == reference_rank(scores, pid) for rank, pid, _ in board.top(10))
@@ -0,0 +1,97 @@
+"""
+Quiz cache: concurrent misses share one load, entries expire after the TTL, a load
+that was invalidated midway is not cached, and cancelling the caller that is loading
+doesn't cancel the callers waiting on it.
+"""
+import asyncio
+
+from app.services import quiz_cache as quiz_cache_module
+from app.services.quiz_cache import QuizCache
+
+
+class Loader:
+    """Counts calls; each one waits until `release` is set."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        return {"_id": "quiz", "version": self.calls}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_concurrent_misses_share_one_load():
+    async def run():
+        cache, loader = QuizCache(8, 60), Loader()
+        gets = [asyncio.ensure_future(cache.get("quiz", loader)) for _ in range(10)]
+        await asyncio.sleep(0)
+        loader.release.set()
+        results = await asyncio.gather(*gets)
+        assert loader.calls == 1
+        assert all(result is results[0] for result in results)
+        assert cache.stats["misses"] == 1 and cache.stats["coalesced"] == 9
+        assert await cache.get("quiz", loader) is results[0]
+        assert cache.stats["hits"] == 1
+
+    asyncio.run(run())
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(quiz_cache_module, "time", clock)
+
+    async def run():
+        cache, loader = QuizCache(8, 60), Loader()
+        loader.release.set()
+        assert (await cache.get("quiz", loader))["version"] == 1
+        clock.now += 59
+        assert (await cache.get("quiz", loader))["version"] == 1
+        clock.now += 2
+        assert (await cache.get("quiz", loader))["version"] == 2
+        assert loader.calls == 2
+
+    asyncio.run(run())
+
+
+def test_invalidate_during_load_is_not_cached():
+    async def run():
+        cache, loader = QuizCache(8, 60), Loader()
+        get = asyncio.ensure_future(cache.get("quiz", loader))
+        await asyncio.sleep(0)
+        # The quiz changes while the old version is being read
+        cache.invalidate("quiz")
+        loader.release.set()
+        assert (await get)["version"] == 1
+        assert (await cache.get("quiz", loader))["version"] == 2
+
+    asyncio.run(run())
+
+
+def test_cancelled_loader_hands_over_to_a_waiter():
+    async def run():
+        cache, loader = QuizCache(8, 60), Loader()
+        leader = asyncio.ensure_future(cache.get("quiz", loader))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(cache.get("quiz", loader)) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        loader.release.set()
+        results = await asyncio.gather(*waiters)
+        assert leader.cancelled()
+        # One waiter took the load over; the others shared it
+        assert loader.calls == 2
+        assert [result["version"] for result in results] == [2, 2, 2]
+
+    asyncio.run(run())
@@ -0,0 +1,57 @@
+"""
+Room code allocation: fresh codes never repeat, only codes this shard owns are handed
+out, and released codes come back only after the reuse delay.
+"""
+from app.core.config import settings
+from app.services import room_codes as room_codes_module
+from app.services.room_codes import CODE_SPACE, RoomCodeAllocator
+from app.services.sharding import ShardRouter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_fresh_codes_are_unique_six_digit_strings():
+    allocator = RoomCodeAllocator(lambda code: True)
+    codes = [allocator.next_code() for _ in range(50_000)]
+    assert len(set(codes)) == len(codes)
+    assert all(len(code) == 6 and code.isdigit() for code in codes)
+
+
+def test_permutation_stays_in_the_code_space():
+    allocator = RoomCodeAllocator(lambda code: True)
+    values = [allocator.permute(index) for index in range(0, CODE_SPACE, 7)]
+    assert len(set(values)) == len(values)
+    assert all(0 <= value < CODE_SPACE for value in values)
+
+
+def test_codes_belong_to_this_shard():
+    routers = [ShardRouter(3, index, [], 128) for index in range(3)]
+    issued = []
+    for router in routers:
+        allocator = RoomCodeAllocator(router.owns)
+        codes = [allocator.next_code() for _ in range(2000)]
+        assert all(router.shard_for(code) == router.index for code in codes)
+        issued.extend(codes)
+    # Shards own disjoint codes, so they never hand out the same one
+    assert len(set(issued)) == len(issued)
+
+
+def test_released_codes_are_reused_after_the_delay(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(room_codes_module, "time", clock)
+    allocator = RoomCodeAllocator(lambda code: True)
+
+    released = allocator.next_code()
+    allocator.release(released)
+    clock.now += settings.ROOM_CODE_REUSE_DELAY_SECONDS - 1
+    assert released not in [allocator.next_code() for _ in range(100)]
+
+    clock.now += 1
+    assert allocator.next_code() == released
+    assert allocator.next_code() != released
@@ -0,0 +1,89 @@
+"""
+Redis room store: room keys carry a TTL that every write refreshes, so rooms nobody
+holds any more don't stay in Redis forever, and a code stays claimed while its room lives.
+"""
+import asyncio
+
+from fakeredis import FakeAsyncRedis
+
+from app.core.config import settings
+from app.services.room_store import RedisRoomStore
+
+CODE = "123456"
+
+
+def make_store() -> RedisRoomStore:
+    return RedisRoomStore(FakeAsyncRedis(decode_responses=True))
+
+
+def test_room_keys_expire():
+    async def run():
+        store = make_store()
+        await store.update(CODE, {"status": "lobby"}, [{"id": "ada", "nickname": "ada"}])
+        for key in (store._room_key(CODE), store._participants_key(CODE)):
+            assert 0 < await store.client.ttl(key) <= settings.ROOM_STORE_TTL_SECONDS
+
+    asyncio.run(run())
+
+
+def test_writes_refresh_the_ttl():
+    async def run():
+        store = make_store()
+        await store.update(CODE, {"status": "lobby"}, [{"id": "ada", "nickname": "ada"}])
+        await store.client.expire(store._room_key(CODE), 5)
+        await store.client.expire(store._participants_key(CODE), 5)
+
+        await store.update(CODE, {"status": "active"})
+        assert await store.client.ttl(store._participants_key(CODE)) > 5
+        await store.client.expire(store._room_key(CODE), 5)
+        assert await store.next_roster_seq(CODE, 0) == 1
+        assert await store.client.ttl(store._room_key(CODE)) > 5
+
+    asyncio.run(run())
+
+
+def test_roster_seq_does_not_recreate_a_room_without_ttl():
+    async def run():
+        store = make_store()
+        await store.next_roster_seq(CODE, 0)
+        assert await store.client.ttl(store._room_key(CODE)) > 0
+
+    asyncio.run(run())
+
+
+def test_code_claim_lives_as_long_as_the_room():
+    async def run():
+        store = make_store()
+        assert await store.claim_room_code(CODE) is True
+        assert await store.claim_room_code(CODE) is False
+        await store.update(CODE, {"status": "lobby"})
+        await store.client.expire(store._code_key(CODE), 5)
+        await store.update(CODE, {"status": "active"})
+        assert await store.client.ttl(store._code_key(CODE)) > 5
+
+    asyncio.run(run())
+
+
+def test_claim_never_wipes_a_live_room():
+    async def run():
+        store = make_store()
+        await store.update(CODE, {"status": "active"}, [{"id": "ada", "nickname": "ada"}])
+        # The claim is gone but the room is not
+        await store.client.delete(store._code_key(CODE))
+
+        assert await store.claim_room_code(CODE) is False
+        assert (await store.load_room(CODE))["participants"].keys() == {"ada"}
+        # ...and the code stays claimed while the room lives
+        assert await store.client.exists(store._code_key(CODE))
+
+    asyncio.run(run())
+
+
+def test_claim_clears_leftovers_of_an_expired_room():
+    async def run():
+        store = make_store()
+        await store.client.hset(store._participants_key(CODE), "ada", "{}")
+        assert await store.claim_room_code(CODE) is True
+        assert not await store.client.exists(store._participants_key(CODE))
+
+    asyncio.run(run())
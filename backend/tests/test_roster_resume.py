@@ -0,0 +1,101 @@
+"""
+Roster resume: a client reconnecting with the roster seq it last saw gets one merged
+delta of everything since, or None (a full snapshot) whenever the worker's log can't
+vouch for every seq in between.
+"""
+import asyncio
+
+from app.core.config import settings
+from app.services.websocket_manager import ConnectionManager
+
+CODE = "016908"
+QUIZ = {"_id": "quiz", "questions": [{"text": "q", "options": [{"text": "a", "is_correct": True}]}]}
+
+
+async def make_room():
+    manager = ConnectionManager()
+    await manager.create_room(CODE, QUIZ)
+    return manager, manager.room_states[CODE]
+
+
+async def flush(manager, *player_ids, left=False):
+    # Players join (or leave) and the roster timer fires
+    room = manager.room_states[CODE]
+    for player_id in player_ids:
+        if left:
+            room.participants.pop(player_id)
+        else:
+            room.add_participant(player_id)
+    manager._roster_changes[CODE] = set(player_ids)
+    await manager.broadcast_participants(CODE)
+
+
+def ids(delta):
+    return sorted(summary["id"] for summary in delta["changed"])
+
+
+def test_contiguous_log_merges_into_one_delta():
+    async def run():
+        manager, room = await make_room()
+        await flush(manager, "ada")
+        await flush(manager, "bob", "cy")
+        await flush(manager, "cy", left=True)
+        await flush(manager, "dee")
+        assert room.roster_seq == 4
+
+        delta = manager._roster_since(CODE, room, 1)
+        assert delta["seq"] == 4
+        assert ids(delta) == ["bob", "dee"]
+        assert delta["removed"] == ["cy"]
+        # Nobody has a socket on this worker
+        assert sorted(delta["offline"]) == ["bob", "dee"]
+
+        # Up to date: an empty delta, not a snapshot
+        assert manager._roster_since(CODE, room, 4) == {"seq": 4, "changed": [], "removed": [], "offline": []}
+        assert ids(manager._roster_since(CODE, room, 0)) == ["ada", "bob", "dee"]
+
+    asyncio.run(run())
+
+
+def test_unusable_seqs_fall_back_to_a_snapshot():
+    async def run():
+        manager, room = await make_room()
+        await flush(manager, "ada")
+        await flush(manager, "bob")
+
+        # From the future (another session, or a stale worker), or not a seq at all
+        assert manager._roster_since(CODE, room, 3) is None
+        for since in (None, "1", 1.0):
+            assert manager._roster_since(CODE, room, since) is None
+
+    asyncio.run(run())
+
+
+def test_gap_from_another_worker_falls_back_to_a_snapshot():
+    async def run():
+        manager, room = await make_room()
+        await flush(manager, "ada")
+        # Seq 2 was allocated by another worker; this one never saw its changes
+        room.roster_seq += 1
+        await flush(manager, "bob")
+
+        assert manager._roster_since(CODE, room, 0) is None
+        assert manager._roster_since(CODE, room, 1) is None
+        assert ids(manager._roster_since(CODE, room, 2)) == ["bob"]
+
+    asyncio.run(run())
+
+
+def test_log_that_doesnt_reach_back_falls_back_to_a_snapshot(monkeypatch):
+    monkeypatch.setattr(settings, "ROSTER_LOG_SIZE", 3)
+
+    async def run():
+        manager, room = await make_room()
+        for n in range(5):
+            await flush(manager, f"p{n}")
+
+        # Seqs 3..5 are kept; 1 and 2 were dropped
+        assert manager._roster_since(CODE, room, 1) is None
+        assert ids(manager._roster_since(CODE, room, 2)) == ["p2", "p3", "p4"]
+
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+"""
+Deadline scheduler: callbacks fire in deadline order whatever order they were added in,
+cancelled deadlines never fire, and coroutine callbacks run as tasks.
+"""
+import asyncio
+
+from app.services.scheduler import DeadlineScheduler
+
+
+def test_fires_in_deadline_order():
+    async def run():
+        scheduler, fired = DeadlineScheduler(), []
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for delay in (0.05, 0.01, 0.03, 0.02, 0.04):
+            scheduler.call_later(delay, lambda d: fired.append((d, loop.time() - start)), delay)
+        # Same deadline: first added fires first
+        scheduler.call_later(0.03, fired.append, ("tie", None))
+
+        await asyncio.sleep(0.1)
+        assert [d for d, _ in fired] == [0.01, 0.02, 0.03, "tie", 0.04, 0.05]
+        assert all(elapsed >= d - 0.002 for d, elapsed in fired if elapsed is not None)
+        assert len(scheduler) == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_deadlines_never_fire():
+    async def run():
+        scheduler, fired = DeadlineScheduler(), []
+        first = scheduler.call_later(0.01, fired.append, "first")
+        scheduler.call_later(0.02, fired.append, "second")
+        last = scheduler.call_later(0.03, fired.append, "last")
+        first.cancel()
+        last.cancel()
+
+        await asyncio.sleep(0.05)
+        assert fired == ["second"]
+        assert len(scheduler) == 0
+
+    asyncio.run(run())
+
+
+def test_earlier_deadline_rearms_the_timer():
+    async def run():
+        scheduler, fired = DeadlineScheduler(), []
+        scheduler.call_later(10, fired.append, "later")
+        scheduler.call_later(0.01, fired.append, "sooner")
+
+        await asyncio.sleep(0.03)
+        assert fired == ["sooner"]
+        assert len(scheduler) == 1
+
+    asyncio.run(run())
+
+
+def test_coroutine_callbacks_run_as_tasks_and_failures_are_contained():
+    async def run():
+        scheduler, fired = DeadlineScheduler(), []
+
+        async def slow(name):
+            await asyncio.sleep(0.05)
+            fired.append(name)
+
+        def broken():
+            raise RuntimeError("boom")
+
+        scheduler.call_later(0.01, slow, "slow")
+        scheduler.call_later(0.01, broken)
+        scheduler.call_later(0.02, fired.append, "quick")
+
+        await asyncio.sleep(0.1)
+        # The slow coroutine didn't hold up the deadline behind it
+        assert fired == ["quick", "slow"]
+
+    asyncio.run(run())
@@ -0,0 +1,181 @@
+"""
+Session write-behind: answers that already landed must not be retried forever, a
+failing Mongo must be backed off from rather than hammered, and a flush rewrites only
+the players that changed.
+
+    python -m pytest -q tests
+"""
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from app.core.config import settings
+from app.services import session_writer as session_writer_module
+from app.services.room_state import Room, compile_quiz
+from app.services.session_writer import SessionWriter, backoff_seconds
+
+
+class FlakyCollection:
+    """A collection whose bulk_write fails the way a real deployment can."""
+
+    def __init__(self, collection, mode: str):
+        self.collection = collection
+        self.mode = mode
+        self.calls = 0
+
+    async def bulk_write(self, requests, ordered=True):
+        self.calls += 1
+        if self.mode == "down":
+            raise AutoReconnect("no primary")
+        if self.calls > 1:
+            return await self.collection.bulk_write(requests, ordered=ordered)
+        if self.mode == "lost_ack":
+            # The server applied the write but the client never heard back
+            await self.collection.bulk_write(requests, ordered=ordered)
+            raise AutoReconnect("connection reset")
+        if self.mode == "partial":
+            # Everything but the second operation is written
+            await self.collection.bulk_write(requests[:1] + requests[2:], ordered=ordered)
+            raise BulkWriteError({"writeErrors": [{"index": 1, "code": 2, "errmsg": "bad value"}]})
+
+
+class FakeDatabase:
+    def __init__(self, answers: FlakyCollection):
+        self.answers = answers
+        self.database = answers.collection.database
+
+    def __getitem__(self, name):
+        return self.answers if name == "session_answers" else self.database[name]
+
+
+@pytest.fixture
+def answers(database, monkeypatch, request):
+    collection = FlakyCollection(database["session_answers"], request.param)
+
+    async def get_database():
+        return FakeDatabase(collection)
+
+    monkeypatch.setattr(session_writer_module, "get_database", get_database)
+    return collection
+
+
+def record(writer: SessionWriter, count: int):
+    for n in range(count):
+        writer.record_answer("session", "123456", f"player-{n}", 0, 1, True, time.time())
+
+
+@pytest.mark.parametrize("answers", ["lost_ack"], indirect=True)
+def test_answers_already_written_are_not_retried_forever(answers):
+    async def run():
+        writer = SessionWriter()
+        await writer.start(background=False)
+        record(writer, 5)
+
+        assert await writer.flush() is False
+        assert len(writer._retry) == 5
+        # The retry comes back as duplicate keys, which means written
+        assert await writer.flush() is True
+        assert writer._retry == []
+        assert writer.queue_depth() == 0
+        assert await answers.collection.count_documents({}) == 5
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("answers", ["partial"], indirect=True)
+def test_only_failed_operations_are_retried(answers):
+    async def run():
+        writer = SessionWriter()
+        await writer.start(background=False)
+        record(writer, 4)
+
+        assert await writer.flush() is False
+        assert [op._doc["player_id"] for op in writer._retry] == ["player-1"]
+        assert writer.stats["answers_written"] == 3
+        assert await writer.flush() is True
+        assert await answers.collection.count_documents({}) == 4
+        assert writer.stats["answers_written"] == 4
+
+    asyncio.run(run())
+
+
+class Clock:
+    """Stands in for asyncio.sleep: records each back-off, stops the loop after `limit`."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.sleeps = []
+        self.done = asyncio.Event()
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        if len(self.sleeps) >= self.limit:
+            self.done.set()
+            await asyncio.Event().wait()
+
+
+@pytest.mark.parametrize("answers", ["down"], indirect=True)
+def test_failing_flushes_back_off(answers, monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_WRITE_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "SESSION_WRITE_INTERVAL_SECONDS", 0.5)
+    monkeypatch.setattr(settings, "SESSION_WRITE_MAX_BACKOFF_SECONDS", 5.0)
+    clock = Clock(limit=6)
+
+    async def run():
+        writer = SessionWriter(sleep=clock.sleep)
+        await writer.start()
+        # A full batch is waiting, which used to mean flushing back-to-back
+        record(writer, 10)
+        await clock.done.wait()
+        flushes = writer.stats["flushes"]
+        await writer.stop()
+        return flushes
+
+    # One attempt per back-off, each twice as long as the last, up to the cap
+    assert asyncio.run(run()) == 6
+    assert clock.sleeps == [1.0, 2.0, 4.0, 5.0, 5.0, 5.0]
+    assert backoff_seconds(1000) == 5.0
+
+
+def make_room(players) -> Room:
+    quiz = {
+        "_id": "quiz",
+        "questions": [
+            {"text": f"q{q}", "options": [{"text": "a", "is_correct": True}, {"text": "b"}]} for q in range(3)
+        ],
+    }
+    room = Room(quiz=compile_quiz(quiz), session_id="session", created_at=datetime(2026, 1, 1))
+    for player_id in players:
+        room.add_participant(player_id)
+    return room
+
+
+def test_only_changed_players_are_rewritten(database):
+    async def run():
+        writer = SessionWriter()
+        await writer.start(background=False)
+        room = make_room(["ada", "J.Smith", "$grace"])
+        writer.mark_session("123456", room, room.participants.values())
+        assert await writer.flush() is True
+
+        smith = room.participants["J.Smith"]
+        smith.set_answer(1, 0)
+        room.set_score(smith, 10)
+        writer.mark_session("123456", room, [smith])
+        writer.mark_session("123456", room, [smith])
+        assert await writer.flush() is True
+
+        assert writer.stats["participants_written"] == 4
+        assert writer.stats["sessions_written"] == 2
+        session = await database["game_sessions"].find_one({"_id": "session"})
+        assert session["room_code"] == "123456" and "participants" not in session
+        docs = {
+            doc["player_id"]: doc async for doc in database["session_participants"].find({"session_id": "session"})
+        }
+        assert set(docs) == {"ada", "J.Smith", "$grace"}
+        assert docs["J.Smith"]["score"] == 10 and docs["J.Smith"]["answers"] == {"1": 0}
+
+    asyncio.run(run())
@@ -0,0 +1,51 @@
+"""
+Consistent hashing of room codes onto shards: every worker computes the same owner,
+load is roughly even, and adding a shard only moves keys onto the new shard.
+"""
+from collections import Counter
+
+from app.services.sharding import HashRing, ShardRouter
+
+CODES = [str(n).zfill(6) for n in range(0, 1_000_000, 37)]
+
+
+def test_every_worker_agrees_on_the_owner():
+    first, second = HashRing(4, 128), HashRing(4, 128)
+    assert all(first.node_for(code) == second.node_for(code) for code in CODES)
+
+    routers = [ShardRouter(4, index, [], 128) for index in range(4)]
+    for code in CODES[:1000]:
+        # Exactly one shard owns each code
+        assert sum(router.owns(code) for router in routers) == 1
+
+
+def test_load_is_roughly_even():
+    for nodes in (2, 4, 8):
+        ring = HashRing(nodes, 128)
+        counts = Counter(ring.node_for(code) for code in CODES)
+        assert sorted(counts) == list(range(nodes))
+        fair = len(CODES) / nodes
+        assert all(0.75 * fair <= count <= 1.25 * fair for count in counts.values())
+
+
+def test_adding_a_shard_only_moves_keys_to_it():
+    before, after = HashRing(4, 128), HashRing(5, 128)
+    moved = 0
+    for code in CODES:
+        old, new = before.node_for(code), after.node_for(code)
+        if old != new:
+            assert new == 4
+            moved += 1
+    # About 1/5 of the keys, nowhere near a full reshuffle
+    assert 0.12 < moved / len(CODES) < 0.28
+
+
+def test_single_shard_owns_everything():
+    router = ShardRouter(1, 0, [], 128)
+    assert not router.enabled
+    assert all(router.owns(code) for code in CODES[:100])
+    assert router.url_for("123456") is None
+
+    urls = ["ws://a", "ws://b"]
+    sharded = ShardRouter(2, 0, urls, 128)
+    assert sharded.url_for("123456") == urls[sharded.shard_for("123456")]
@@ -0,0 +1,114 @@
+"""
+ConnectionManager against a shared Redis room store: sockets that reach a worker while
+it is still loading a room wait for that load, a failed load leaves nothing behind,
+and a quick disconnect/reconnect never leaves the worker unsubscribed from its room.
+"""
+import asyncio
+import json
+
+from fakeredis import FakeAsyncRedis, FakeServer
+
+from app.services.room_store import RedisRoomStore
+from app.services.websocket_manager import ConnectionManager
+
+CODE = "016908"
+QUIZ = {"_id": "quiz", "questions": [{"text": "q", "options": [{"text": "a", "is_correct": True}]}]}
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        pass
+
+    def types(self):
+        return [message["type"] for message in self.sent]
+
+
+async def make_manager(server: FakeServer) -> ConnectionManager:
+    manager = ConnectionManager()
+    await manager.use_store(RedisRoomStore(FakeAsyncRedis(server=server, decode_responses=True)))
+    return manager
+
+
+async def settle():
+    # Let pub/sub listeners and send queues run
+    for _ in range(20):
+        await asyncio.sleep(0.01)
+
+
+def test_concurrent_first_connects_share_one_load():
+    async def run():
+        server = FakeServer()
+        creator, worker = await make_manager(server), await make_manager(server)
+        await creator.create_room(CODE, QUIZ)
+
+        results = await asyncio.gather(
+            worker.connect(CODE, "ada", FakeWebSocket()),
+            worker.connect(CODE, "bob", FakeWebSocket()),
+            return_exceptions=True,
+        )
+        assert results == [None, None]
+        assert set(worker.active_connections[CODE]) == {"ada", "bob"}
+        assert worker.room_states[CODE].quiz.quiz_id == "quiz"
+
+    asyncio.run(run())
+
+
+def test_failed_load_leaves_nothing_behind():
+    async def run():
+        manager = await make_manager(FakeServer())
+        load_room = manager.store.load_room
+
+        async def unavailable(room_code):
+            raise ConnectionError("redis down")
+
+        manager.store.load_room = unavailable
+        results = await asyncio.gather(
+            manager.connect(CODE, "ada", FakeWebSocket()),
+            manager.connect(CODE, "bob", FakeWebSocket()),
+            return_exceptions=True,
+        )
+        assert all(isinstance(r, ConnectionError) for r in results)
+        assert CODE not in manager.active_connections
+        await settle()
+        assert CODE not in manager._subscribed
+
+        # The next socket loads the room afresh
+        manager.store.load_room = load_room
+        await manager.connect(CODE, "ada", FakeWebSocket())
+        assert set(manager.active_connections[CODE]) == {"ada"}
+        assert CODE in manager._subscribed
+
+    asyncio.run(run())
+
+
+def test_reconnect_right_after_the_last_disconnect_stays_subscribed():
+    async def run():
+        server = FakeServer()
+        host, worker = await make_manager(server), await make_manager(server)
+        await host.create_room(CODE, QUIZ)
+        await host.connect(CODE, "host", FakeWebSocket())
+
+        first = FakeWebSocket()
+        await worker.connect(CODE, "ada", first)
+        # The last socket leaves and the player is straight back, before the
+        # unsubscribe has had a chance to run
+        worker.disconnect(CODE, "ada", first)
+        again = FakeWebSocket()
+        await worker.connect(CODE, "ada", again)
+        await settle()
+        assert CODE in worker._subscribed
+
+        await host.broadcast(CODE, {"type": "game_start", "payload": {}})
+        await settle()
+        assert "game_start" in again.types()
+
+    asyncio.run(run())
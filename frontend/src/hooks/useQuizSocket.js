@@ -2,12 +2,18 @@ import { useEffect, useRef, useState, useCallback } from 'react';
 
 export const useQuizSocket = (roomCode, userId) => {
     const socketRef = useRef(null);
+    // Last roster seq applied; deltas must arrive as seq + 1 or we resync
+    const rosterSeqRef = useRef(0);
+    // Sent back on reconnect so the server only sends what we missed
+    const resumeTokenRef = useRef(null);
+    const hasQuestionsRef = useRef(false);
     const [isConnected, setIsConnected] = useState(false);
     const [gameState, setGameState] = useState({
         status: 'lobby', // lobby, countdown, question, result, leaderboard
         participants: [],
         currentQuestion: null,
-        leaderboard: [],
+        leaderboard: [], // top K only: [{ rank, id, nickname, score }]
+        my_rank: null, // { rank, score, total } for this player
         timeLeft: 0
     });
     const [lastError, setLastError] = useState(null);
@@ -15,55 +21,125 @@ export const useQuizSocket = (roomCode, userId) => {
     useEffect(() => {
         if (!roomCode || !userId) return;
 
-        // Connect to FastAPI WebSocket
-        const wsBaseUrl = import.meta.env.VITE_WS_URL || 'ws://localhost:8000';
-        const wsUrl = `${wsBaseUrl}/ws/${roomCode}/${userId}`;
-        socketRef.current = new WebSocket(wsUrl);
+        let stopped = false;
+        let retryTimer = null;
+        let attempt = 0;
+        // Set when a shard redirects us to the worker that owns this room
+        let shardUrl = null;
+        resumeTokenRef.current = null;
+        hasQuestionsRef.current = false;
 
-        socketRef.current.onopen = () => {
-            console.log("Connected to QuizPulse WebSocket");
-            setIsConnected(true);
-            setLastError(null);
-        };
-
-        socketRef.current.onmessage = (event) => {
-            try {
-                const message = JSON.parse(event.data);
-                handleServerMessage(message);
-            } catch (err) {
-                console.error("Failed to parse WS message:", err);
+        const connect = () => {
+            // Connect to FastAPI WebSocket, resuming if we were connected before
+            const wsBaseUrl = shardUrl || import.meta.env.VITE_WS_URL || 'ws://localhost:8000';
+            let wsUrl = `${wsBaseUrl}/ws/${roomCode}/${userId}`;
+            if (resumeTokenRef.current) {
+                const params = new URLSearchParams({
+                    resume: resumeTokenRef.current,
+                    roster_seq: String(rosterSeqRef.current),
+                    questions: hasQuestionsRef.current ? '1' : '0',
+                });
+                wsUrl += `?${params}`;
             }
-        };
+            const socket = new WebSocket(wsUrl);
+            socketRef.current = socket;
 
-        socketRef.current.onclose = () => {
-            console.log("Disconnected from QuizPulse WebSocket");
-            setIsConnected(false);
-        };
+            socket.onopen = () => {
+                console.log("Connected to QuizPulse WebSocket");
+                attempt = 0;
+                setIsConnected(true);
+                setLastError(null);
+            };
+
+            socket.onmessage = (event) => {
+                try {
+                    const message = JSON.parse(event.data);
+                    handleServerMessage(message);
+                } catch (err) {
+                    console.error("Failed to parse WS message:", err);
+                }
+            };
+
+            socket.onclose = (event) => {
+                console.log("Disconnected from QuizPulse WebSocket");
+                setIsConnected(false);
+                if (stopped || event.code === 4000) return; // 4000: room not found
+                if (event.code === 4001 && event.reason) {
+                    // 4001: room lives on another shard, whose URL is the close reason
+                    shardUrl = event.reason;
+                    connect();
+                    return;
+                }
+                // Jittered exponential backoff, so a whole venue doesn't reconnect in lockstep
+                const delay = Math.min(1000 * 2 ** attempt, 15000) * (0.5 + Math.random());
+                attempt += 1;
+                retryTimer = setTimeout(connect, delay);
+            };
 
-        socketRef.current.onerror = (error) => {
-            console.error("WebSocket Error:", error);
-            setLastError("Connection Error");
+            socket.onerror = (error) => {
+                console.error("WebSocket Error:", error);
+                setLastError("Connection Error");
+            };
         };
 
+        connect();
+
         return () => {
+            stopped = true;
+            clearTimeout(retryTimer);
             if (socketRef.current) {
                 socketRef.current.close();
             }
         };
     }, [roomCode, userId]);
 
+    const applyRosterDelta = (prev, { changed, removed, offline = [] }) => {
+        const byId = new Map((prev.participants || []).map(p => [p.id, p]));
+        removed.forEach(id => byId.delete(id));
+        changed.forEach(p => byId.set(p.id, { ...p, online: !offline.includes(p.id) }));
+        return { ...prev, participants: Array.from(byId.values()) };
+    };
+
     const handleServerMessage = (message) => {
         // console.log("Received:", message.type, message.payload); // Debug logging
         switch (message.type) {
-            case 'state_sync':
+            case 'state_sync': {
                 // Initial state recovery or reconnnect
-                setGameState(prev => ({ ...prev, ...message.payload }));
+                const { resume_token, roster_delta, ...payload } = message.payload;
+                resumeTokenRef.current = resume_token ?? null;
+                if (payload.questions) hasQuestionsRef.current = true;
+                if (roster_delta) {
+                    // Resumed: only the roster changes we missed
+                    rosterSeqRef.current = roster_delta.seq;
+                    setGameState(prev => applyRosterDelta({ ...prev, ...payload }, roster_delta));
+                } else {
+                    rosterSeqRef.current = payload.roster_seq ?? 0;
+                    setGameState(prev => ({ ...prev, ...payload }));
+                }
                 break;
+            }
             case 'participant_update':
                 setGameState(prev => ({ ...prev, participants: message.payload }));
                 break;
+            case 'participant_snapshot':
+                rosterSeqRef.current = message.payload.seq;
+                setGameState(prev => ({ ...prev, participants: message.payload.participants }));
+                break;
+            case 'participant_delta': {
+                const { seq } = message.payload;
+                if (seq <= rosterSeqRef.current) break; // Already covered by a snapshot
+                if (seq !== rosterSeqRef.current + 1) {
+                    // Missed a delta; ask for a full snapshot
+                    sendRaw('sync_participants', { since: rosterSeqRef.current });
+                    break;
+                }
+                rosterSeqRef.current = seq;
+                setGameState(prev => applyRosterDelta(prev, message.payload));
+                break;
+            }
             case 'game_start':
                 // NTA Flow: Start = Active, Payload contains questions
+                hasQuestionsRef.current = true;
                 setGameState(prev => ({
                     ...prev,
                     status: 'active',
@@ -80,8 +156,32 @@ export const useQuizSocket = (roomCode, userId) => {
                 }));
                 break;
             case 'leaderboard_update':
-                setGameState(prev => ({ ...prev, leaderboard: message.payload }));
+                // { leaderboard, total }
+                setGameState(prev => ({ ...prev, ...message.payload }));
+                break;
+            case 'your_rank':
+                setGameState(prev => ({ ...prev, my_rank: message.payload }));
                 break;
+            case 'final_standings':
+                // Host only, after game_over: every player rather than the top K
+                setGameState(prev => ({ ...prev, ...message.payload }));
+                break;
+            case 'rejected': {
+                // The server turned a frame away. Rate-limited ones come back verbatim
+                // with how long to wait, so e.g. an answer is resent, not lost.
+                const { reason, retry_after, frame } = message.payload;
+                if (frame && retry_after != null) {
+                    const socket = socketRef.current;
+                    setTimeout(() => {
+                        if (socket === socketRef.current && socket.readyState === WebSocket.OPEN) {
+                            socket.send(frame);
+                        }
+                    }, retry_after * 1000 * (1 + Math.random()));
+                } else {
+                    console.warn("Server rejected a message:", reason);
+                }
+                break;
+            }
             case 'game_over':
                 setGameState(prev => ({
                     ...prev,
@@ -94,13 +194,15 @@ export const useQuizSocket = (roomCode, userId) => {
         }
     };
 
-    const sendAction = useCallback((type, payload) => {
+    const sendRaw = (type, payload) => {
         if (socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
             socketRef.current.send(JSON.stringify({ type, payload }));
         } else {
             console.warn("Cannot send message: WebSocket not open");
         }
-    }, []);
+    };
+
+    const sendAction = useCallback(sendRaw, []);
 
     return { isConnected, gameState, sendAction, lastError };
 };
@@ -1,9 +1,11 @@
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
 export const api = {
-    getQuizzes: async () => {
-        const res = await fetch(`${API_URL}/api/quizzes/`);
+    getQuizzes: async (cursor = null) => {
+        const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+        const res = await fetch(`${API_URL}/api/quizzes/${query}`);
         if (!res.ok) throw new Error('Failed to fetch quizzes');
+        // Paginated: { items, next_cursor }; pass next_cursor back for the next page
         return res.json();
     },
 
@@ -6,7 +6,9 @@ import { api } from '@/lib/api';
 
 const Dashboard = () => {
     const [quizzes, setQuizzes] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         loadQuizzes();
@@ -14,8 +16,9 @@ const Dashboard = () => {
 
     const loadQuizzes = async () => {
         try {
-            const data = await api.getQuizzes();
-            setQuizzes(data);
+            const page = await api.getQuizzes();
+            setQuizzes(page.items);
+            setNextCursor(page.next_cursor);
         } catch (err) {
             console.error(err);
         } finally {
@@ -23,11 +26,25 @@ const Dashboard = () => {
         }
     };
 
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const page = await api.getQuizzes(nextCursor);
+            setQuizzes((loaded) => [...loaded, ...page.items]);
+            setNextCursor(page.next_cursor);
+        } catch (err) {
+            console.error(err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleDelete = async (e, id) => {
         e.preventDefault(); // Prevent Link click
         if (confirm("Are you sure you want to delete this quiz?")) {
             await api.deleteQuiz(id);
-            loadQuizzes();
+            // Drop it locally, so pages already loaded stay loaded
+            setQuizzes((loaded) => loaded.filter((quiz) => quiz._id !== id));
         }
     };
 
@@ -66,7 +83,7 @@ const Dashboard = () => {
                                         {quiz.title}
                                     </h3>
                                     <p className="text-sm text-muted-foreground mt-1">
-                                        {quiz.questions?.length || 0} Questions
+                                        {quiz.question_count ?? quiz.questions?.length ?? 0} Questions
                                     </p>
                                 </div>
                                 <Button
@@ -96,6 +113,14 @@ const Dashboard = () => {
                     ))}
                 </div>
 
+                {nextCursor && (
+                    <div className="flex justify-center mt-10">
+                        <Button variant="secondary" onClick={loadMore} disabled={loadingMore}>
+                            {loadingMore ? 'Loading...' : 'Load more'}
+                        </Button>
+                    </div>
+                )}
+
                 {quizzes.length === 0 && !loading && (
                     <div className="text-center py-24 border-2 border-dashed border-border rounded-xl bg-card/50">
                         <div className="mx-auto w-12 h-12 rounded-xl bg-secondary flex items-center justify-center mb-4">
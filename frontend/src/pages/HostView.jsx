@@ -15,7 +15,7 @@ const HostView = ({ gameState, sendAction, roomCode }) => {
     };
 
     // Calculate stats
-    // Note: In NTA mode, backend sends 'participants' with 'answers' map.
+    // Note: In NTA mode, backend sends 'participants' with an 'answered' progress counter.
     // 'currentQuestion' is irrelevant for Host now.
 
     // If we don't know total questions from gamestate directly (since we only sent sanitized questions to users),
@@ -79,11 +79,11 @@ const HostView = ({ gameState, sendAction, roomCode }) => {
                         <div className="bg-card border border-border rounded-xl flex-1 overflow-y-auto p-4">
                             <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-4">
                                 {participants?.map((p) => {
-                                    const answerCount = Object.keys(p.answers || {}).length;
+                                    const answerCount = p.answered ?? Object.keys(p.answers || {}).length;
                                     const isCompleted = p.completed;
 
                                     return (
-                                        <div key={p.id} className="p-4 rounded-lg bg-secondary/20 border border-border flex justify-between items-center">
+                                        <div key={p.id} className={`p-4 rounded-lg bg-secondary/20 border border-border flex justify-between items-center ${p.online === false ? 'opacity-50' : ''}`}>
                                             <div>
                                                 <div className="font-bold text-lg mb-1">{p.nickname}</div>
                                                 <div className="text-xs text-muted-foreground font-mono bg-background px-2 py-1 rounded inline-block">
@@ -126,7 +126,7 @@ const HostView = ({ gameState, sendAction, roomCode }) => {
                                 <tbody>
                                     {leaderboard?.map((p, idx) => (
                                         <tr key={p.id} className="border-t border-border hover:bg-secondary/20 transition-colors">
-                                            <td className="p-4 font-mono text-muted-foreground">#{idx + 1}</td>
+                                            <td className="p-4 font-mono text-muted-foreground">#{p.rank ?? idx + 1}</td>
                                             <td className="p-4 font-medium">{p.nickname}</td>
                                             <td className="p-4 font-mono font-bold text-right text-primary">{p.score}</td>
                                         </tr>
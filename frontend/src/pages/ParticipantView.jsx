@@ -106,13 +106,17 @@ const ParticipantView = ({ gameState, sendAction, userId }) => {
     if (status === 'game_over') {
         // Show Leaderboard from `gameState.leaderboard`?
         // Or just a summary.
-        const myResult = gameState.leaderboard?.find(p => p.id === userId);
+        // The leaderboard is only the top K; our own rank and score arrive separately
+        const myResult = gameState.my_rank ?? gameState.leaderboard?.find(p => p.id === userId);
 
         return (
             <div className="flex flex-col items-center justify-center h-full text-center p-6 bg-background">
                 <h2 className="text-4xl font-bold text-foreground mb-4">Test Submitted</h2>
                 <div className="bg-card border border-border p-8 rounded-xl shadow-lg">
                     <p className="text-2xl font-mono mb-2">Score: <span className="text-primary">{myResult?.score || 0}</span></p>
+                    {myResult?.rank && (
+                        <p className="text-muted-foreground mb-2">Rank #{myResult.rank}{myResult.total ? ` of ${myResult.total}` : ''}</p>
+                    )}
                     <p className="text-muted-foreground">Thank you for participating.</p>
                 </div>
                 <a href="/" className="mt-8 text-primary hover:underline font-semibold">Exit to Home</a>